@@ -0,0 +1,71 @@
+"""
+Guards the cold start of main.py against import time regressions.
+
+    python -m benchmark.imports
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, prints the
+slowest imports and exits non-zero when a heavy SDK is imported eagerly again or
+the total import time goes over IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 400  # Cumulative import time allowed for `import main`
+SLOWEST_SHOWN = 10
+
+# SDKs that must only be imported on first use
+LAZY_MODULES = ["google.generativeai", "supabase", "bs4", "requests", "lxml"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(statement: str = "import main") -> dict:
+    """Returns the cumulative import time in microseconds of every module imported"""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    result.check_returncode()
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        timings[module.strip()] = int(cumulative)
+
+    return timings
+
+
+def main():
+    timings = measure_imports()
+    total_ms = timings["main"] / 1000
+
+    print(f"{'module':<40}{'cumulative ms':>15}")
+    for module, cumulative in sorted(timings.items(), key=lambda item: -item[1])[
+        :SLOWEST_SHOWN
+    ]:
+        print(f"{module:<40}{cumulative / 1000:>15.1f}")
+
+    eager = [module for module in LAZY_MODULES if module in timings]
+    failures = []
+
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if total_ms > IMPORT_BUDGET_MS:
+        failures.append(f"{total_ms:.0f} ms is over the {IMPORT_BUDGET_MS} ms budget")
+
+    if failures:
+        sys.exit("Import time regression, " + "; ".join(failures) + ".")
+
+    print(f"\n`import main` took {total_ms:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
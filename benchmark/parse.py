@@ -0,0 +1,100 @@
+"""
+Benchmarks LinkedIn card extraction against the saved fixture page.
+
+    python -m benchmark.parse
+
+The legacy path mirrors the original scraper, a full html.parser tree searched
+with find_all()/find(). Every installed backend of utility.parser is compared
+against it on pages holding 25, 100 and 400 cards.
+"""
+
+import os
+import timeit
+from bs4 import BeautifulSoup
+import utility.parser as parser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGE_SIZES = [1, 4, 16]  # Multiples of the 25 cards held in the fixture
+REPEAT = 5
+
+SELECTORS = parser.CardSelectors(
+    "base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card",
+    "hidden-nested-link",
+    "base-search-card__title",
+    "job-search-card__location",
+    "base-card__full-link",
+)
+
+
+def load_page(size: int) -> str:
+    """Returns the fixture page with its list of cards repeated size times"""
+
+    with open(os.path.join(FIXTURES, "linkedin_page.html"), "r") as file:
+        page = file.read()
+
+    start = page.index("<li>")
+    end = page.rindex("</li>") + len("</li>")
+
+    return page[:start] + page[start:end] * size + page[end:]
+
+
+def legacy_extract(content: str) -> list:
+    """The original extraction, kept here as the baseline"""
+
+    soup = BeautifulSoup(content, "html.parser")
+    cards = []
+
+    for elem in soup.find_all("div", class_=SELECTORS.card):
+        cards.append(
+            {
+                "company": elem.find(class_=SELECTORS.company).text.strip(),
+                "title": elem.find(class_=SELECTORS.title).text.strip(),
+                "location": elem.find(class_=SELECTORS.location).text.strip(),
+                "link": elem.find(class_=SELECTORS.link)["href"],
+                "datetime": elem.find("time").get("datetime"),
+            }
+        )
+
+    return cards
+
+
+def backend_extract(backend: str):
+    """Returns an extraction function pinned to backend"""
+
+    def extract(content: str) -> list:
+        parser.parser_backend.cache_clear()
+        os.environ["HTML_PARSER"] = backend
+        return list(parser.extract_cards(content, SELECTORS))
+
+    return extract
+
+
+def main():
+    extractors = {"legacy html.parser": legacy_extract}
+    for backend in parser.PARSER_BACKENDS:
+        if parser.parser_backend(backend) == backend:
+            extractors[backend] = backend_extract(backend)
+
+    print(f"{'backend':<20}{'cards':>8}{'ms/page':>12}{'cards/s':>12}{'speedup':>10}")
+
+    for size in PAGE_SIZES:
+        content = load_page(size)
+        expected = legacy_extract(content)
+        baseline = None
+
+        for name, extract in extractors.items():
+            assert extract(content) == expected, f"{name} extracted different cards"
+
+            seconds = min(
+                timeit.repeat(lambda: extract(content), number=1, repeat=REPEAT)
+            )
+            baseline = baseline or seconds
+
+            print(
+                f"{name:<20}{len(expected):>8}{seconds * 1000:>12.2f}"
+                f"{len(expected) / seconds:>12.0f}{baseline / seconds:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Benchmarks the scrape → classify → ingest → deliver pipeline without live services.
+
+    python -m benchmark.pipeline
+
+LinkedIn and GitHub are served from the fixtures by a local HTTP server that
+also stands in for the Discord webhook, PaLM is replaced by a stub answering
+after STUB_LLM_LATENCY and opportunities go to a throwaway SQLite store. Every
+stage is timed on its own and end to end for a growing number of postings,
+reporting throughput and the peak memory traced by tracemalloc.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from time import sleep
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+from benchmark.parse import FIXTURES, SELECTORS
+import main as bot
+import utility.opportunity as opps
+import utility.metrics as metrics
+import utility.palm as palm
+import utility.scrape as scrape
+import utility.sources as sources
+import utility.storage as storage
+import utility.utils as utils
+import utility.watermark as watermark
+from utility.config import RunConfig
+from utility.tracks import Track, load_tracks
+
+# LinkedIn serves 25 postings per page and 250 walks all of LINKEDIN_MAX_PAGES
+POSTING_COUNTS = [25, 100, 250]
+REPEAT = 3
+STUB_LLM_LATENCY = 0.05  # Seconds the stub takes per request, roughly a PaLM round trip
+
+# Fixture postings date back to 2023, so no posting is dropped by --days-needed
+CONFIG = RunConfig(days_needed=100000, incremental=False)
+
+CARD_TITLE = re.compile(r'(class="base-search-card__title">\s*)')
+
+
+def repeat_cards(copies: int) -> List[str]:
+    """Returns the 25 fixture cards copied copies times, every copy a distinct posting"""
+
+    with open(os.path.join(FIXTURES, "linkedin_page.html"), "r") as file:
+        page = file.read()
+
+    cards = page[page.index("<li>") : page.rindex("</li>") + len("</li>")]
+    cards = ["<li>" + card for card in cards.split("<li>")[1:]]
+
+    return [
+        CARD_TITLE.sub(rf"\g<1>Batch {copy} ", card).replace(
+            "/jobs/view/", f"/jobs/view/batch-{copy}-"
+        )
+        for copy in range(copies)
+        for card in cards
+    ]
+
+
+def linkedin_page(cards: List[str]) -> str:
+    """Returns the fixture page holding cards instead of its own"""
+
+    with open(os.path.join(FIXTURES, "linkedin_page.html"), "r") as file:
+        page = file.read()
+
+    start = page.index("<li>")
+    end = page.rindex("</li>") + len("</li>")
+
+    return page[:start] + "".join(cards) + page[end:]
+
+
+def github_readme(rows: int) -> str:
+    """Returns the fixture README with its table repeated until it holds rows rows"""
+
+    with open(os.path.join(FIXTURES, "github_readme.md"), "r") as file:
+        lines = file.read().splitlines()
+
+    header = [line for line in lines if not line.startswith("| ")]
+    table = [line for line in lines if line.startswith("| ")]
+    head, body = table[:2], table[2:]
+
+    copies = -(-rows // len(body))
+    body = [
+        line.replace("/jobs/", f"/jobs/batch-{copy}-")
+        for copy in range(copies)
+        for line in body
+    ]
+
+    return "\n".join(header[:4] + head + body + header[4:]) + "\n"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the fixtures and accepts webhook posts"""
+
+    pages: List[str] = []  # LinkedIn result pages, 25 postings each
+    single_page = ""  # Every posting on one page
+    readme = ""
+
+    def respond(self, status: int, body: str = "") -> None:
+        data = body.encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+
+        if parts.path == "/linkedin":
+            page = int(parse_qs(parts.query).get("start", ["0"])[0]) // 25
+            self.respond(200, self.pages[page] if page < len(self.pages) else "")
+        elif parts.path == "/linkedin/single":
+            self.respond(200, self.single_page)
+        elif parts.path == "/README.md":
+            self.respond(200, self.readme)
+        else:
+            self.respond(404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond(204)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures(postings: int) -> None:
+    """Points the handler at fixtures holding postings postings"""
+
+    cards = repeat_cards(-(-postings // 25))[:postings]
+
+    FixtureHandler.pages = [
+        linkedin_page(cards[start : start + 25]) for start in range(0, postings, 25)
+    ]
+    FixtureHandler.single_page = linkedin_page(cards)
+    FixtureHandler.readme = github_readme(postings)
+
+
+def stub_parsed_values(prompt: str) -> List[bool]:
+    """Stands in for PaLM, accepting every other posting of the prompt for every audience"""
+
+    sleep(STUB_LLM_LATENCY)
+
+    verdicts = [index % 2 == 0 for index in range(prompt.count("\nCompany: "))]
+    audiences = len(re.findall(r"^Audience \d+ ", prompt, re.MULTILINE))
+
+    return [[verdict] * audiences for verdict in verdicts] if audiences else verdicts
+
+
+STATE_IDS = count()
+
+
+def reset_state(directory: str) -> None:
+    """Starts the next measurement with an empty store, verdict cache and watermarks"""
+
+    state = next(STATE_IDS)
+
+    os.environ["SQLITE_DB_PATH"] = os.path.join(directory, f"store-{state}.sqlite3")
+    os.environ["VERDICT_CACHE_PATH"] = os.path.join(
+        directory, f"verdicts-{state}.sqlite3"
+    )
+    os.environ["WATERMARK_PATH"] = os.path.join(directory, f"marks-{state}.sqlite3")
+
+    storage.STORE_INSTANCE = None
+    watermark.WATERMARKS_INSTANCE = None
+
+
+def measure(stage, directory: str) -> tuple:
+    """Returns the best time over REPEAT runs and the peak traced memory of one more"""
+
+    def run():
+        reset_state(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return stage()
+
+    seconds = min(timeit.repeat(run, number=1, repeat=REPEAT))
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+async def end_to_end(tracks: List[Track]) -> None:
+    """Runs main()'s single pass, from scraping to marking the delivered postings processed"""
+
+    metrics.METRICS.reset()
+
+    await bot.run_once(tracks, CONFIG)
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    directory = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    os.environ.update(
+        {
+            "STORAGE_BACKEND": "sqlite",
+            "LINKEDIN_URL": f"{base_url}/linkedin",
+            "LINKEDIN_INTERN_URL": f"{base_url}/linkedin",
+            "GH_INTERN24_URL": f"{base_url}/README.md",
+            "DISCORD_WEBHOOK": f"{base_url}/webhook",
+            "PALM_API_KEY": "stub",
+            "SOURCES": "linkedin_jobs,github_internships",
+            "PROMPTS_PATH": "prompts/cs.json",
+            "MESSAGE_PATH": "msg/message.json",
+        }
+    )
+
+    # The stand-ins answer at once, so waiting between retries would only add noise
+    palm.get_parsed_values = stub_parsed_values
+    scrape.RETRY_BACKOFF = 0
+    utils.initialize()
+
+    # The default track, read from PROMPTS_PATH, MESSAGE_PATH and DISCORD_WEBHOOK
+    tracks = load_tracks()
+    template = tracks[0].template
+
+    print(f"{'stage':<36}{'postings':>10}{'ms':>10}{'postings/s':>12}{'peak KiB':>10}")
+
+    for postings in POSTING_COUNTS:
+        serve_fixtures(postings)
+
+        # Lifts the per source caps
+        for name, source in sources.SOURCES.items():
+            sources.SOURCES[name] = dataclasses.replace(source, max_items=postings)
+
+        content = FixtureHandler.single_page
+        opportunities = utils.blueprint_opportunity_formatter(
+            content,
+            *dataclasses.astuple(SELECTORS),
+            True,
+            postings,
+            "full_time",
+            100000,
+        )
+        assert len(opportunities) == postings, "fixture postings were dropped"
+
+        stages = {
+            "content_parser": lambda: utils.content_parser(
+                f"{base_url}/linkedin/single"
+            ),
+            "blueprint_opportunity_formatter": lambda: utils.blueprint_opportunity_formatter(
+                content,
+                *dataclasses.astuple(SELECTORS),
+                True,
+                postings,
+                "full_time",
+                100000,
+            ),
+            "request_github_internship24_data": lambda: scrape.request_github_internship24_data(
+                CONFIG
+            ),
+            "gpt_track_analyze": lambda: palm.gpt_track_analyze(
+                opportunities,
+                {track.name: track.prompts["full_time"] for track in tracks},
+                CONFIG,
+            ),
+            "ingest_opportunities": lambda: opps.ingest_opportunities(opportunities),
+            "format_opportunities": lambda: opps.format_opportunities(
+                opportunities, template
+            ),
+            "end to end": lambda: asyncio.run(end_to_end(tracks)),
+        }
+
+        for name, stage in stages.items():
+            seconds, peak = measure(stage, directory)
+
+            print(
+                f"{name:<36}{postings:>10}{seconds * 1000:>10.1f}"
+                f"{postings / seconds:>12.0f}{peak / 1024:>10.0f}"
+            )
+
+    server.shutdown()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
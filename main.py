@@ -1,123 +1,136 @@
-import requests
-import os
-import json
 import asyncio
-from datetime import date
+from dataclasses import asdict
+from functools import partial
+from typing import Dict, List
 import utility.utils as ut
 import utility.db as db
+import utility.storage as storage
 import utility.opportunity as opps
-from dotenv import load_dotenv
-from utility.scrape import (
-    request_github_internship24_data,
-    request_linkedin_data,
-    request_linkedin_internship24_data,
-)
-from utility.palm import gpt_job_analyze
-from utility.error import ErrorMsg
+import utility.message as message
+import utility.webhook as webhook
+import utility.watermark as watermark
+import utility.metrics as metrics
+import utility.http_cache as http_cache
+import utility.sources as sources
+import utility.scheduler as scheduler
+from utility.config import RunConfig
+from utility.fetch import AsyncFetcher
+from utility.palm import gpt_track_analyze
+from utility.tracks import Track, load_tracks
 
+JOB_SECTION_TITLE = "¸„.-•~¹°”ˆ˜¨ JOB OPPORTUNITIES ¨˜ˆ”°¹~•-.„¸"
+INTERNSHIP_SECTION_TITLE = " ¸„.-•~¹°”ˆ˜¨ INTERNSHIP OPPORTUNITIES ¨˜ˆ”°¹~•-.„¸"
+DIGEST_MINUTES = 15  # Minutes between the digests posted in --daemon mode
 
-# Load and determine if all env variables are set
-load_dotenv()
-ut.verify_set_env_variables()
+
+def build_webhook_messages(
+    job_data_results: List[opps.Opportunity],
+    internship_data_results: List[opps.Opportunity],
+    template: str,
+) -> List[message.PackedMessage]:
+    """Renders both kinds of opportunities and packs them into webhook messages"""
+
+    sections = [
+        message.EmbedSection(
+            title,
+            list(zip(message.render_lines(data_results, template), data_results)),
+        )
+        for title, data_results in [
+            (JOB_SECTION_TITLE, job_data_results),
+            (INTERNSHIP_SECTION_TITLE, internship_data_results),
+        ]
+    ]
+
+    with metrics.timer("format"):
+        return message.pack_messages(sections, header=message.header_embed())
 
 
 async def execute_opportunities_webhook(
-    webhook_url: str, job_message: str, internship_message: str
-):
+    webhook_urls: List[str],
+    messages: List[message.PackedMessage],
+    fetcher: AsyncFetcher = None,
+) -> List[opps.Opportunity]:
     """
-    Executes the message which receives the formatted message
-    from the format_opportunities() function as well as the webhook
-    url for the respected discord channel
+    Executes the messages built by build_webhook_messages() against the
+    webhook urls of the respected discord channels and returns the
+    opportunities that were delivered
     """
 
-    # Create a dictionary payload for the message content
-    payload = {
-        "content": "# ✨ NEW OPPORTUNITY POSTINGS BELOW! ✨",
-        "tts": False,
-        "embeds": [
-            {
-                "title": f"✧･ﾟ: *✧･ﾟ:* 🎀 {date.today()} 🎀 ✧･ﾟ: *✧･ﾟ:*｡",
-                "color": 0xFFFFFF,
-            },
-        ],
-    }
-
-    if job_message:
-        payload["embeds"].append(
-            {
-                "title": "¸„.-•~¹°”ˆ˜¨ JOB OPPORTUNITIES ¨˜ˆ”°¹~•-.„¸",
-                "description": job_message,
-                "color": 0x05A3FF,
-            },
-        )
+    with metrics.timer("webhook"):
+        return await webhook.deliver_messages(webhook_urls, messages, fetcher)
 
-    if internship_message:
-        payload["embeds"].append(
-            {
-                "title": " ¸„.-•~¹°”ˆ˜¨ INTERNSHIP OPPORTUNITIES ¨˜ˆ”°¹~•-.„¸",
-                "description": internship_message,
-                "color": 0x05A3FF,
-            },
-        )
-
-    # Convert the payload to JSON format
-    json_payload = json.dumps(payload)
 
-    # This will send a POST request to the webhook_url!
-    response = requests.post(
-        webhook_url, data=json_payload, headers={"Content-Type": "application/json"}
-    )
+async def deliver_track(
+    track: Track, fetcher: AsyncFetcher = None
+) -> List[opps.Opportunity]:
+    """Posts the unprocessed opportunities of a track to its webhooks"""
 
-    if response.status_code == 204:
-        print("Webhook message was sent sucessfully!")
-    else:
-        print(
-            f"Failed to send webhook message. {ErrorMsg().status_code_failure(response.status_code)}"
+    with metrics.timer("select"):
+        internship_data_results = opps.list_opportunities(
+            False, "internship", filtered=True, track=track.name
+        )
+        job_data_results = opps.list_opportunities(
+            True, "full_time", filtered=True, track=track.name
         )
 
+    # A digest without new postings posts nothing, not even the header
+    if not internship_data_results and not job_data_results:
+        return []
 
-async def main():
-    # Creates table in database
-    with_create_table_command = ut.extract_command_value().create
-    if with_create_table_command:
-        TABLE_NAME = os.getenv("DB_TABLE")
+    # Lines are packed into as few embeds and messages as Discord's size limits allow
+    webhook_messages = build_webhook_messages(
+        job_data_results, internship_data_results, track.template
+    )
 
-        db.create(TABLE_NAME)
+    return await execute_opportunities_webhook(
+        track.webhooks, webhook_messages, fetcher
+    )
 
-        print(f"Sucessfully created {TABLE_NAME}!")
-        exit()  # Exit the main function to avoid calling other functions
 
-    file_paths = [os.getenv("MESSAGE_PATH"), os.getenv("PROMPTS_PATH")]
-    customized_object = ut.user_customization(file_paths)
+async def process_opportunities(
+    grouped: Dict[str, List[opps.Opportunity]], tracks: List[Track], config: RunConfig
+) -> None:
+    """Dedupes, classifies and stores scraped opportunities for every track"""
 
-    # Determines the customized prompts for PaLM
-    prompt_object = ut.determine_prompts(customized_object["customized_prompts"])
+    # Consolidates all job-related opportunities into a comprehensive List[Opportunity], eliminating repetitive calls to the LLM SERVER.
+    with metrics.timer("dedup"):
+        job_opps = ut.dedupe_opportunities(grouped.get("full_time", []))
+        internship_opps = ut.dedupe_opportunities(grouped.get("internship", []))
 
-    # Determines the customized message for the webhook
-    finalized_message = ut.determine_customized_message(
-        customized_object["customized_message"]
-    )
+    for opp_type, opportunities in [
+        ("full_time", job_opps),
+        ("internship", internship_opps),
+    ]:
+        # Each posting is classified once for every track, off the event loop so
+        # other sources keep polling while PaLM answers
+        with metrics.timer("classify"):
+            analysis = await asyncio.to_thread(
+                gpt_track_analyze,
+                opportunities,
+                {track.name: track.prompts[opp_type] for track in tracks},
+                config,
+            )
 
-    # Consolidates all job-related opportunities into a comprehensive List[Opportunity], eliminating repetitive calls to the LLM SERVER.
-    job_opps = ut.merge_all_opportunity_data(request_linkedin_data())
+        with metrics.timer("ingest"):
+            for track in tracks:
+                opps.ingest_opportunities(
+                    analysis.accepted[track.name], track=track.name
+                )
 
-    filtered_job_opps = gpt_job_analyze(
-        job_opps,
-        prompt_object["full_time"],
-    )
+        # Scraping progress only covers postings that were stored or rejected,
+        # ones PaLM skipped are scraped again
+        unclassified = {opportunity.link for opportunity in analysis.unclassified}
+        watermark.get_watermarks().confirm(
+            opportunity.link
+            for opportunity in grouped.get(opp_type, [])
+            if opportunity.link not in unclassified
+        )
 
-    opps.ingest_opportunities(filtered_job_opps)
+    watermark.get_watermarks().commit()
 
-    # Consolidates all job-related opportunities into a comprehensive List[Opportunity], eliminating repetitive calls to the LLM SERVER.
-    internship_opps = ut.merge_all_opportunity_data(
-        request_linkedin_internship24_data(), request_github_internship24_data()
-    )
 
-    filtered_internship_opps = gpt_job_analyze(
-        internship_opps,
-        prompt_object["internship"],
-    )
-    opps.ingest_opportunities(filtered_internship_opps)
+async def deliver_digest(tracks: List[Track], fetcher: AsyncFetcher = None) -> None:
+    """Posts the unprocessed opportunities of every track and marks the delivered ones"""
 
     # To test the code without consuming API requests, call reset_processed_status().
     # This function efficiently resets the processed status of 5 job postings by setting them to _processed = 0.
@@ -125,28 +138,139 @@ async def main():
     # To do so, please comment the function calls above this comment.
     # After, please uncomment the following line of code:
 
-    # db.reset_processed_status()
+    # storage.get_store().reset_processed_status()
 
-    internship_data_results = opps.list_opportunities(
-        False, "internship", filtered=True
-    )
-    job_data_results = opps.list_opportunities(True, "full_time", filtered=True)
+    # Tracks are posted concurrently, each to its own webhooks
+    delivered = [
+        opportunity
+        for track_delivered in await asyncio.gather(
+            *(deliver_track(track, fetcher) for track in tracks)
+        )
+        for opportunity in track_delivered
+    ]
 
-    internship_formatted_message = opps.format_opportunities(
-        internship_data_results, finalized_message
-    )
-    job_formatted_message = opps.format_opportunities(
-        job_data_results, finalized_message
-    )
+    # Opportunities of a message that failed stay unprocessed and are sent next run
+    with metrics.timer("mark_processed"):
+        opps.update_opportunities_status(delivered)
 
-    discord_webhook = os.getenv("DISCORD_WEBHOOK")
+    metrics.increment("delivered", len(delivered))
+
+
+# db.connection_stats() counts from process start, so reports add what changed since the previous one
+REPORTED_DB_STATS = {}
+
+
+def write_run_report(config: RunConfig) -> None:
+    """Writes the report of the run, or of the daemon since its last digest"""
+
+    for name, value in asdict(db.connection_stats()).items():
+        metrics.increment(f"db.{name}", value - REPORTED_DB_STATS.get(name, 0))
+        REPORTED_DB_STATS[name] = value
+
+    metrics.write_report(config.report_path, config.openmetrics_path)
 
-    await execute_opportunities_webhook(
-        discord_webhook, job_formatted_message, internship_formatted_message
-    )
 
-    opps.update_opportunities_status(job_data_results)
-    opps.update_opportunities_status(internship_data_results)
+async def run_once(tracks: List[Track], config: RunConfig) -> None:
+    """Scrapes every enabled source, stores what the tracks accept and posts it"""
+
+    # Every enabled source is fetched concurrently, so scraping takes as long as the slowest source
+    enabled = sources.enabled_sources()
+
+    with metrics.timer("scrape"):
+        results = await sources.gather_sources(*enabled, config=config)
+        grouped = sources.group_by_type(enabled, results)
+
+    await process_opportunities(grouped, tracks, config)
+    await deliver_digest(tracks)
+
+    write_run_report(config)
+
+
+async def run_daemon(tracks: List[Track], config: RunConfig) -> None:
+    """
+    Polls every enabled source on its own jittered interval and posts what was
+    found as a digest every --digest-minutes, until SIGINT or SIGTERM. The HTTP
+    client, database and LLM clients and caches stay warm between polls.
+    """
+
+    enabled = sources.enabled_sources()
+    digest_interval = (config.digest_minutes or DIGEST_MINUTES) * 60
+
+    stop = asyncio.Event()
+    scheduler.stop_on_signals(stop)
+
+    # Classifying, storing and posting share the store, so one runs at a time
+    pipeline_lock = asyncio.Lock()
+
+    async with AsyncFetcher() as fetcher:
+
+        async def poll(source: sources.Source) -> None:
+            with metrics.timer("scrape"):
+                results = await sources.run_source(fetcher, config, source)
+
+            async with pipeline_lock:
+                await process_opportunities(
+                    sources.group_by_type([source], [results]), tracks, config
+                )
+
+        async def digest() -> None:
+            async with pipeline_lock:
+                await deliver_digest(tracks, fetcher)
+
+            write_run_report(config)
+            metrics.METRICS.reset()
+
+        print(
+            f"Polling {', '.join(source.name for source in enabled)}, posting a digest every {digest_interval // 60} minutes."
+        )
+
+        await asyncio.gather(
+            *(
+                scheduler.run_every(
+                    source.name, source.interval, partial(poll, source), stop
+                )
+                for source in enabled
+            ),
+            scheduler.run_every(
+                "digest",
+                digest_interval,
+                digest,
+                stop,
+                jitter=0,
+                initial_delay=digest_interval,
+            ),
+        )
+
+        # Postings found since the last digest are still posted before shutting down
+        await digest()
+
+
+async def main():
+    # Command line arguments are parsed once and handed down as a RunConfig
+    config = RunConfig.from_args()
+    metrics.METRICS.reset()
+
+    # Load and determine if all env variables are set
+    ut.initialize()
+
+    if config.http_cache:
+        http_cache.configure(config.http_cache)
+
+    # Creates table in database
+    if config.create:
+        store = storage.get_store()
+        store.create_table()
+
+        print(f"Sucessfully created {store.describe()}!")
+        exit()  # Exit the main function to avoid calling other functions
+
+    # Every audience has its own prompts, message and webhooks, TRACKS_PATH lists them
+    tracks = load_tracks()
+
+    if config.daemon:
+        await run_daemon(tracks, config)
+    else:
+        await run_once(tracks, config)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,51 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import utility.metrics as metrics
+from utility.opportunity import Opportunity, normalize_text
+
+BLOCKLIST_PATH = "blocklist.json"
+RULE_ACTIONS = ["deny", "allow"]
+RULE_FIELDS = ["company", "title", "location"]
+
+# Keys of a blocklist file and the kind of rule each of their values becomes
+RULE_KINDS = {"keywords": "keyword", "regexes": "regex", "aliases": "alias"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Struct to hold a single allow or deny rule on one field of a posting"""
+
+    # deny rejects a posting, allow excuses it from the deny rules of its field
+    action: str
+    field: str
+    kind: str  # keyword, regex or alias
+    value: str
+    label: str = None  # Names the rule in the hit counters instead of its value
+
+    @property
+    def name(self) -> str:
+        return f"{self.action}.{self.field}.{self.kind}.{self.label or self.value}"
+
+    def pattern(self) -> str:
+        """Returns the regex matching the normalized field"""
+
+        if self.kind == "keyword":
+            # Whole words only, so Staff does not reject Staffing
+            return rf"(?<!\w){re.escape(normalize_text(self.value))}(?!\w)"
+        if self.kind == "alias":
+            return rf"^{re.escape(normalize_text(self.value))}$"
+
+        return self.value
+
+
 class BlockList:
-    """A class holding methods to determine if a company is blocklisted"""
+    """
+    Rejects postings that match a deny rule unless an allow rule of the same field
+    matches too. The rules of a field are compiled into one combined regex.
+    """
 
     BLOCKLISTED_COMPANIES = set(
         [
@@ -8,7 +54,151 @@ class BlockList:
         ]
     )
 
+    def __init__(self, rules: List[Rule] = None):
+        self.rules = [
+            Rule("deny", "company", "alias", company)
+            for company in sorted(self.BLOCKLISTED_COMPANIES)
+        ] + (rules or [])
+
+        self.matchers = {}
+
+        for action in RULE_ACTIONS:
+            for field in RULE_FIELDS:
+                field_rules = [
+                    rule
+                    for rule in self.rules
+                    if rule.action == action and rule.field == field
+                ]
+
+                if field_rules:
+                    self.matchers[(action, field)] = (
+                        field_rules,
+                        re.compile(
+                            "|".join(
+                                f"(?P<rule{index}>{rule.pattern()})"
+                                for index, rule in enumerate(field_rules)
+                            ),
+                            re.IGNORECASE,
+                        ),
+                    )
+
+    def match(self, action: str, field: str, text: str) -> Optional[Rule]:
+        """Returns the first rule of action and field matching text, or None"""
+
+        if (action, field) not in self.matchers:
+            return None
+
+        field_rules, matcher = self.matchers[(action, field)]
+        found = matcher.search(normalize_text(text))
+
+        if found is None:
+            return None
+
+        # Regex rules may hold groups of their own, so the first named group set wins
+        for index, rule in enumerate(field_rules):
+            if found.group(f"rule{index}") is not None:
+                return rule
+
+    def rejecting_rule(self, opportunity: Opportunity) -> Optional[Rule]:
+        """Returns the deny rule the opportunity falls under, or None when it passes"""
+
+        for field in RULE_FIELDS:
+            text = getattr(opportunity, field)
+            denied = self.match("deny", field, text)
+
+            if denied is None:
+                continue
+
+            allowed = self.match("allow", field, text)
+
+            if allowed is None:
+                return denied
+
+            metrics.increment(f"prefilter.{allowed.name}")
+
+        return None
+
+    def filter(self, opportunities: List[Opportunity]) -> List[Opportunity]:
+        """Drops the rejected opportunities, counting the hits of every rule"""
+
+        kept = []
+
+        for opportunity in opportunities:
+            rule = self.rejecting_rule(opportunity)
+
+            if rule is None:
+                kept.append(opportunity)
+            else:
+                metrics.increment(f"prefilter.{rule.name}")
+
+        metrics.increment("prefilter.rejected", len(opportunities) - len(kept))
+
+        return kept
+
     def is_blacklisted_company(self, company: str) -> bool:
         """Determines if the company is blacklisted or not"""
 
-        return True if company in self.BLOCKLISTED_COMPANIES else False
+        return self.match("deny", "company", company) is not None
+
+
+def read_rules(entries: Dict[str, Dict[str, Dict[str, list]]]) -> List[Rule]:
+    """
+    Turns the action -> field -> kind -> values mapping of a blocklist file into
+    rules. Values are a list, or a mapping of labels to values.
+    """
+
+    rules = []
+
+    for action, fields in entries.items():
+        for field, kinds in fields.items():
+            for kind, values in kinds.items():
+                if (
+                    action not in RULE_ACTIONS
+                    or field not in RULE_FIELDS
+                    or kind not in RULE_KINDS
+                ):
+                    raise ValueError(
+                        f"Unknown blocklist rule '{action}.{field}.{kind}'."
+                    )
+
+                labeled = (
+                    values.items()
+                    if isinstance(values, dict)
+                    else [(None, value) for value in values]
+                )
+                rules += [
+                    Rule(action, field, RULE_KINDS[kind], value, label)
+                    for label, value in labeled
+                ]
+
+    return rules
+
+
+def load_blocklist(path: str = None) -> BlockList:
+    """
+    Returns the BlockList of the BLOCKLIST_PATH file. Without one, only the
+    built-in BLOCKLISTED_COMPANIES are rejected.
+    """
+
+    path = path or os.getenv("BLOCKLIST_PATH")
+
+    # The default file is optional, one named explicitly has to exist
+    if not path and not os.path.exists(BLOCKLIST_PATH):
+        return BlockList()
+
+    with open(path or BLOCKLIST_PATH, "r") as file:
+        return BlockList(read_rules(json.load(file)))
+
+
+BLOCKLIST_INSTANCE = None
+
+
+def get_blocklist() -> BlockList:
+    """Returns the process wide BlockList, compiled once"""
+
+    global BLOCKLIST_INSTANCE
+
+    if BLOCKLIST_INSTANCE is None:
+        BLOCKLIST_INSTANCE = load_blocklist()
+
+    return BLOCKLIST_INSTANCE
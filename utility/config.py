@@ -0,0 +1,130 @@
+import argparse
+import re
+from dataclasses import dataclass
+from typing import List
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    """Returns the parser of every command line option"""
+
+    parser = argparse.ArgumentParser(
+        description="Custom command for specifying days for fetching jobs."
+    )
+
+    # Add an argument (the custom command) along with the help functionality to see what the command does
+    parser.add_argument(
+        "--days-needed",
+        type=str,
+        nargs=1,
+        help="The amount of days to extract jobs.",
+    )
+
+    parser.add_argument(
+        "--create", action="store_true", help="Creates the table in your database."
+    )
+
+    parser.add_argument(
+        "--report",
+        type=str,
+        help="Writes the JSON run report to this path instead of printing it.",
+    )
+
+    parser.add_argument(
+        "--openmetrics",
+        type=str,
+        help="Also writes the run metrics to this path in the OpenMetrics text format.",
+    )
+
+    parser.add_argument(
+        "--http-cache",
+        action="store_true",
+        help="Serves scraped pages from the local response cache and stores the ones fetched.",
+    )
+
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serves scraped pages only from the local response cache, never the network.",
+    )
+
+    parser.add_argument(
+        "--classify-batch-size",
+        type=int,
+        help="Postings sent to the LLM per request.",
+    )
+
+    parser.add_argument(
+        "--classify-max-workers",
+        type=int,
+        help="LLM requests kept in flight at once.",
+    )
+
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keeps running, polling every source on its own interval and posting digests.",
+    )
+
+    parser.add_argument(
+        "--digest-minutes",
+        type=int,
+        help="Minutes between the digests posted in --daemon mode.",
+    )
+
+    parser.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="Ignores the high-water marks of previous runs and walks every source in full.",
+    )
+
+    return parser
+
+
+def clean_days_needed(days_needed_command_value: List[str]) -> int:
+    """Validates and cleans the value following --days-needed"""
+
+    try:
+        return int(re.sub(r"\D", "", days_needed_command_value[0]))
+    except (TypeError, ValueError):
+        return 0  # Default to 0 or handle as needed
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """
+    Struct to hold the settings of a single run. Built once from the command line
+    in main() and handed down, library callers can construct it directly.
+    """
+
+    days_needed: int = 0  # Postings older than this many days are skipped
+    create: bool = False  # Creates the table instead of running the pipeline
+    incremental: bool = True  # Stops walking sources at postings seen by earlier runs
+    report_path: str = None  # Where the JSON run report goes, None prints it
+    openmetrics_path: str = None  # Where the OpenMetrics text goes, None skips it
+    # on or replay, None leaves it to the HTTP_CACHE env variable
+    http_cache: str = None
+    classify_batch_size: int = None  # Postings per LLM request, None keeps the default
+    classify_max_workers: int = None  # LLM requests in flight, None keeps the default
+    daemon: bool = False  # Keeps polling sources instead of running once
+    digest_minutes: int = None  # Minutes between daemon digests, None keeps the default
+
+    @classmethod
+    def from_args(cls, argv: List[str] = None) -> "RunConfig":
+        """Parses argv (sys.argv by default) into a RunConfig"""
+
+        arguments = build_argument_parser().parse_args(argv)
+
+        return cls(
+            days_needed=clean_days_needed(arguments.days_needed),
+            create=arguments.create,
+            incremental=not arguments.full_scan,
+            classify_batch_size=arguments.classify_batch_size,
+            classify_max_workers=arguments.classify_max_workers,
+            daemon=arguments.daemon,
+            digest_minutes=arguments.digest_minutes,
+            report_path=arguments.report,
+            openmetrics_path=arguments.openmetrics,
+            http_cache=(
+                "replay" if arguments.replay else "on" if arguments.http_cache else None
+            ),
+        )
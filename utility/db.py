@@ -1,60 +1,126 @@
 import os
-from supabase import create_client
 from dataclasses import dataclass
 from dotenv import load_dotenv
-import requests
+import threading
 from utility.error import ErrorMsg
 
-load_dotenv()
 ERROR_MSG = ErrorMsg()
 
 
+HTTP_POOL_SIZE = 10  # Keep-alive connections held by the shared raw SQL session
+
+
 @dataclass
-class SupabaseConnection:
-    """Constructs Supabase connection."""
+class ConnectionStats:
+    """Counters showing how often the shared connections were reused"""
+
+    clients_created: int = 0  # Supabase clients built, one per process is ideal
+    client_reuses: int = 0  # Requests for a client served by the existing one
+    round_trips: int = 0  # HTTP responses received from Supabase
+
+
+class ConnectionManager:
+    """Lazily creates and owns the process wide Supabase client and HTTP session"""
+
+    def __init__(self):
+        self.client = None
+        self.session = None
+        self.stats = ConnectionStats()
+        self.lock = threading.Lock()
+
+    def count_round_trip(self, *_) -> None:
+        """HTTP response hook counting every round trip"""
+
+        self.stats.round_trips += 1
+
+    def supabase_client(self):
+        """Returns the shared Supabase client, creating it on first use"""
+
+        with self.lock:
+            if self.client is not None:
+                self.stats.client_reuses += 1
+                return self.client
+
+            # The supabase SDK is only imported once a client is actually needed
+            from supabase import create_client
+
+            load_dotenv()
+            self.client = create_client(
+                os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+            )
+            self.stats.clients_created += 1
+
+            # Every table request goes through the one keep-alive pool of the postgrest session
+            self.client.postgrest.session.event_hooks["response"].append(
+                self.count_round_trip
+            )
+
+            return self.client
+
+    def http_session(self):
+        """Returns the shared keep-alive session used for raw SQL requests"""
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self.lock:
+            if self.session is None:
+                self.session = requests.Session()
+                self.session.mount(
+                    "https://",
+                    HTTPAdapter(
+                        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+                    ),
+                )
+                self.session.hooks["response"].append(self.count_round_trip)
+
+            return self.session
+
+
+CONNECTION_MANAGER = ConnectionManager()
 
-    CLIENT: any = None
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL")
-    SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
-    SUPABASE_API_URL: str = f"{SUPABASE_URL}/rest/v1/rpc"
 
-    def __post_init__(self):
-        self.CLIENT = self.create_supabase_client()
+def get_client():
+    """Returns the process wide Supabase client"""
 
-    def create_supabase_client(self):
-        """Creates the Supabase client with the URL and key variables."""
+    return CONNECTION_MANAGER.supabase_client()
 
-        return create_client(self.SUPABASE_URL, self.SUPABASE_KEY)
 
+def connection_stats() -> ConnectionStats:
+    """Returns the round trip and reuse counters of the shared connections"""
 
-SUPABASE_INSTANCE = SupabaseConnection().CLIENT
+    return CONNECTION_MANAGER.stats
 
 
 def delete_all_opportunity_type(TABLE_NAME: str, opp_type: str) -> None:
     """Deletes all opportunities of a specific type for testing purposes only."""
 
-    SUPABASE_INSTANCE.table(TABLE_NAME).delete().eq("type", opp_type).execute()
+    get_client().table(TABLE_NAME).delete().eq("type", opp_type).execute()
 
 
 def reset_processed_status(TABLE_NAME: str) -> None:
     """Jobs status will be set to _processed = 0 for testing a debugging purposes"""
 
-    SUPABASE_INSTANCE.table(TABLE_NAME).update({"processed": 0}).eq(
-        "processed", 1
-    ).limit(5).execute()
+    get_client().table(TABLE_NAME).update({"processed": 0}).eq("processed", 1).limit(
+        5
+    ).execute()
 
 
 def execute_sql(sql: str):
     """Executes a raw SQL query using the Supabase HTTP API."""
-    connection = SupabaseConnection()
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
     headers = {
-        "apikey": connection.SUPABASE_KEY,
-        "Authorization": f"Bearer {connection.SUPABASE_KEY}",
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
         "Content-Type": "application/json",
     }
 
     data = {"query": sql}
-    response = requests.post(connection.SUPABASE_API_URL, headers=headers, json=data)
+    response = CONNECTION_MANAGER.http_session().post(
+        f"{url}/rest/v1/rpc", headers=headers, json=data
+    )
 
     response.raise_for_status()
     return response
@@ -65,12 +131,20 @@ def create_table(TABLE_NAME: str) -> None:
 
     request = f"""
     CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        id TEXT PRIMARY KEY,
+        key TEXT UNIQUE,
         company TEXT,
         title TEXT,
+        location TEXT,
         link TEXT,
         processed INTEGER DEFAULT 0,
-        type TEXT
+        type TEXT,
+        track TEXT NOT NULL DEFAULT 'default',
+        source TEXT,
+        score DOUBLE PRECISION NOT NULL DEFAULT 0
     );
+    CREATE INDEX IF NOT EXISTS {TABLE_NAME}_selection
+        ON {TABLE_NAME} (track, type, processed, score DESC, id DESC);
     """
 
     response = execute_sql(request)
@@ -84,7 +158,7 @@ def create_table(TABLE_NAME: str) -> None:
 def add_column(column_name: str, data_type: str) -> None:
     """Adds a column for adjustment to the table after the table has been created"""
 
-    TABLE_NAME = os.getenv("DB_TABLE")
+    TABLE_NAME = os.getenv("DB_TABLE_NAME")
 
     request = f"""
         ALTER TABLE {TABLE_NAME} ADD COLUMN {column_name} {data_type};
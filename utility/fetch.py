@@ -0,0 +1,106 @@
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+import utility.http_cache as http_cache
+
+MAX_CONNECTIONS = 20  # Size of the shared connection pool
+MAX_CONNECTIONS_PER_HOST = 4  # Concurrent requests allowed against a single host
+REQUEST_TIMEOUT = 15.0  # Seconds before a single request is abandoned
+
+
+class AsyncFetcher:
+    """A pooled HTTP client shared by every scraping source"""
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.host_limits = {}
+        self.cache = http_cache.get_cache()  # None unless --http-cache or --replay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the pooled client and every connection it holds"""
+
+        await self.client.aclose()
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        """Returns the semaphore limiting concurrent requests to the url's host"""
+
+        host = urlsplit(url).netloc
+
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.max_connections_per_host)
+
+        return self.host_limits[host]
+
+    async def get(self, url: str, headers: dict = None) -> httpx.Response:
+        """Sends a GET request through the pool while respecting the per host limit"""
+
+        if self.cache is not None:
+            cached = self.cache.get(url, headers)
+
+            if cached is not None:
+                return cached.to_httpx()
+            if self.cache.replay:
+                raise http_cache.CacheMissError(
+                    f"No cached response for {url} to replay."
+                )
+
+        async with self.host_limit(url):
+            response = await self.client.get(url, headers=headers)
+
+        if self.cache is not None and response.status_code == 200:
+            self.cache.set(
+                url, headers, response.status_code, response.headers, response.content
+            )
+
+        return response
+
+    async def post(
+        self, url: str, json: dict = None, headers: dict = None
+    ) -> httpx.Response:
+        """Sends a POST request with a JSON body through the pool"""
+
+        async with self.host_limit(url):
+            return await self.client.post(url, json=json, headers=headers)
+
+    async def get_text(self, url: str, headers: dict = None) -> str:
+        """Returns the body of the url as text"""
+
+        response = await self.get(url, headers)
+
+        return response.text
+
+    @asynccontextmanager
+    async def stream(
+        self, url: str, headers: dict = None
+    ) -> AsyncIterator[httpx.Response]:
+        """Opens a GET response whose body is read on demand, leaving early closes the download"""
+
+        # A cached response is always read in full, so it can be stored and replayed
+        if self.cache is not None:
+            yield await self.get(url, headers)
+            return
+
+        async with self.host_limit(url):
+            async with self.client.stream("GET", url, headers=headers) as response:
+                yield response
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+HTTP_CACHE_PATH = ".cache/http.sqlite3"
+HTTP_CACHE_TTL = 60 * 60 * 6  # Seconds a cached response is served outside replay mode
+
+# Compressed bytes kept before the oldest responses are evicted
+HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# on reads through the cache, replay never hits the network
+HTTP_CACHE_MODES = ["on", "replay"]
+
+# Request headers that change the response and so are part of the key, credentials are not
+VARY_HEADERS = {"accept", "accept-language", "range", "x-rapidapi-host"}
+
+# Response headers describing the wire format, the cached body is already decoded
+WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no cached response"""
+
+
+@dataclass
+class CachedResponse:
+    """Struct to hold a response as it was stored in the cache"""
+
+    url: str
+    status_code: int
+    headers: dict
+    content: bytes
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def to_httpx(self):
+        """Returns the response as an httpx.Response, body included"""
+
+        import httpx
+
+        return httpx.Response(
+            self.status_code,
+            headers=self.headers,
+            content=self.content,
+            request=httpx.Request("GET", self.url),
+        )
+
+
+class HttpCache:
+    """Stores zlib compressed GET responses in SQLite, keyed by url and VARY_HEADERS"""
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: int = HTTP_CACHE_TTL,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+        replay: bool = False,
+    ):
+        self.path = path or os.getenv("HTTP_CACHE_PATH", HTTP_CACHE_PATH)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)"
+        )
+
+    @staticmethod
+    def key(url: str, headers: dict = None) -> str:
+        """Returns the cache key of a GET request"""
+
+        varying = sorted(
+            (name.lower(), str(value))
+            for name, value in (headers or {}).items()
+            if name.lower() in VARY_HEADERS
+        )
+
+        return hashlib.sha256(json.dumps([url, varying]).encode("utf-8")).hexdigest()
+
+    def get(self, url: str, headers: dict = None) -> Optional[CachedResponse]:
+        """Returns the cached response, expired ones are still served when replaying"""
+
+        oldest = 0 if self.replay else time.time() - self.ttl
+
+        row = self.connection.execute(
+            "SELECT status, headers, body FROM responses WHERE key = ? AND created_at >= ?",
+            (self.key(url, headers), oldest),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return CachedResponse(url, row[0], json.loads(row[1]), zlib.decompress(row[2]))
+
+    def set(
+        self,
+        url: str,
+        headers: dict,
+        status_code: int,
+        response_headers: dict,
+        content: bytes,
+    ) -> None:
+        """Stores a response, then evicts expired and excess entries"""
+
+        body = zlib.compress(content)
+        stored_headers = {
+            name: value
+            for name, value in dict(response_headers).items()
+            if name.lower() not in WIRE_HEADERS
+        }
+        now = time.time()
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(url, headers),
+                    url,
+                    status_code,
+                    json.dumps(stored_headers),
+                    body,
+                    len(body),
+                    now,
+                ),
+            )
+            self.evict(now)
+
+    def evict(self, now: float = None) -> None:
+        """Drops expired responses and the oldest ones beyond max_bytes"""
+
+        now = now or time.time()
+
+        self.connection.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+        )
+        self.connection.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY created_at DESC) AS kept
+                    FROM responses
+                ) WHERE kept > ?
+            )
+            """,
+            (self.max_bytes,),
+        )
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection"""
+
+        self.connection.close()
+
+
+CACHE_MODE = None
+CACHE_INSTANCE = None
+
+
+def configure(mode: str = None) -> None:
+    """Sets the cache mode of the process, None reads HTTP_CACHE and off disables the cache"""
+
+    global CACHE_MODE, CACHE_INSTANCE
+
+    if mode not in [None, "off", *HTTP_CACHE_MODES]:
+        raise ValueError(f"Unknown HTTP cache mode '{mode}'.")
+
+    CACHE_MODE = mode
+    CACHE_INSTANCE = None
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Returns the process wide cache, or None when caching is off"""
+
+    global CACHE_INSTANCE
+
+    mode = CACHE_MODE or os.getenv("HTTP_CACHE", "off")
+
+    if mode not in HTTP_CACHE_MODES:
+        return None
+
+    if CACHE_INSTANCE is None:
+        CACHE_INSTANCE = HttpCache(replay=mode == "replay")
+
+    return CACHE_INSTANCE
+
+
+def cached_request(url: str, headers: dict = None) -> CachedResponse:
+    """Blocking GET served from the cache when enabled, only 200s are stored"""
+
+    cache = get_cache()
+
+    if cache is not None:
+        cached = cache.get(url, headers)
+
+        if cached is not None:
+            return cached
+        if cache.replay:
+            raise CacheMissError(f"No cached response for {url} to replay.")
+
+    import requests
+
+    response = requests.get(url, headers=headers)
+
+    if cache is not None and response.status_code == 200:
+        cache.set(
+            url, headers, response.status_code, response.headers, response.content
+        )
+
+    return CachedResponse(
+        url, response.status_code, dict(response.headers), response.content
+    )
@@ -0,0 +1,195 @@
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from string import Formatter
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from utility.opportunity import Opportunity
+
+# Discord rejects a webhook message past any of these limits
+EMBED_TITLE_LIMIT = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+MESSAGE_EMBED_LIMIT = 10
+MESSAGE_CHARACTER_LIMIT = 6000  # Summed over the titles and descriptions of every embed
+
+TEMPLATE_FIELDS = {"company", "title", "location", "link"}
+TRUNCATION_MARK = "…"
+
+HEADER_CONTENT = "# ✨ NEW OPPORTUNITY POSTINGS BELOW! ✨"
+HEADER_COLOR = 0xFFFFFF
+SECTION_COLOR = 0x05A3FF
+
+
+class MessageTemplate:
+    """A user message template parsed once and rendered once per opportunity"""
+
+    def __init__(self, template: str):
+        self.template = template
+        self.pieces = []  # (literal, field, format_spec, conversion) tuples
+
+        for literal, name, format_spec, conversion in Formatter().parse(template):
+            if name is not None and name not in TEMPLATE_FIELDS:
+                raise KeyError(name)
+
+            self.pieces.append((literal, name, format_spec, conversion))
+
+    def render(self, opportunity: "Opportunity") -> str:
+        """Returns the template filled in with the fields of opportunity"""
+
+        parts = []
+
+        for literal, name, format_spec, conversion in self.pieces:
+            parts.append(literal)
+
+            if name is None:
+                continue
+
+            value = getattr(opportunity, name)
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            elif conversion == "a":
+                value = ascii(value)
+
+            parts.append(format(value, format_spec))
+
+        return "".join(parts)
+
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> MessageTemplate:
+    """Returns the compiled template, parsed only the first time it is seen"""
+
+    return MessageTemplate(template)
+
+
+def render_lines(data_results: List["Opportunity"], template: str) -> List[str]:
+    """Returns one rendered line per opportunity"""
+
+    compiled = compile_template(template)
+
+    return [compiled.render(data_block) for data_block in data_results]
+
+
+@dataclass
+class EmbedSection:
+    """Struct to hold a titled group of rendered lines and the items they came from"""
+
+    title: str
+    lines: List[Tuple[str, object]]  # (rendered line, item) pairs
+    color: int = SECTION_COLOR
+
+
+@dataclass
+class PackedMessage:
+    """Struct to hold one webhook payload and the items it delivers"""
+
+    payload: dict
+    items: list = field(default_factory=list)
+
+    def embeds(self) -> List[dict]:
+        return self.payload["embeds"]
+
+    def characters(self) -> int:
+        return sum(
+            len(embed.get("title", "")) + len(embed.get("description", ""))
+            for embed in self.embeds()
+        )
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cuts text down to limit characters, marking that it was cut"""
+
+    if len(text) <= limit:
+        return text
+
+    return text[: limit - len(TRUNCATION_MARK)] + TRUNCATION_MARK
+
+
+def pack_messages(
+    sections: List[EmbedSection], content: str = HEADER_CONTENT, header: dict = None
+) -> List[PackedMessage]:
+    """
+    Packs the lines of every section into as few embeds and messages as
+    Discord's limits allow. A section spilling over continues in a new embed
+    under the same title, and a line is never split across embeds. Without any
+    lines there is nothing to post, so no message is packed.
+    """
+
+    if not any(section.lines for section in sections):
+        return []
+
+    messages = []
+
+    # Descriptions are built as lists of lines and joined once, after packing
+    filled = []  # (embed, lines) pairs
+
+    def new_message() -> PackedMessage:
+        message = PackedMessage({"content": "", "tts": False, "embeds": []})
+        messages.append(message)
+
+        return message
+
+    message = new_message()
+    message.payload["content"] = content
+    message_characters = 0  # Running message.characters() of the message being filled
+
+    if header:
+        message.embeds().append(header)
+        message_characters += len(header.get("title", "")) + len(
+            header.get("description", "")
+        )
+
+    for section in sections:
+        title = truncate(section.title, EMBED_TITLE_LIMIT)
+        lines = None  # Lines of the embed being filled
+        description_characters = 0
+
+        for line, item in section.lines:
+            line = truncate(line, EMBED_DESCRIPTION_LIMIT)
+
+            if lines is not None:
+                added = len(line) + 1  # The newline joining it to the description
+
+                fits_embed = description_characters + added <= EMBED_DESCRIPTION_LIMIT
+                fits_message = message_characters + added <= MESSAGE_CHARACTER_LIMIT
+
+                if fits_embed and fits_message:
+                    lines.append(line)
+                    description_characters += added
+                    message_characters += added
+                    message.items.append(item)
+                    continue
+
+            # The line opens a new embed, in a new message when this one is full
+            needed = len(title) + len(line)
+            if (
+                len(message.embeds()) >= MESSAGE_EMBED_LIMIT
+                or message_characters + needed > MESSAGE_CHARACTER_LIMIT
+            ):
+                message = new_message()
+                message_characters = 0
+
+            lines = [line]
+            embed = {"title": title, "description": "", "color": section.color}
+            filled.append((embed, lines))
+            message.embeds().append(embed)
+            message.items.append(item)
+            description_characters = len(line)
+            message_characters += needed
+
+    for embed, lines in filled:
+        embed["description"] = "\n".join(lines)
+
+    return messages
+
+
+def header_embed(day: date = None) -> dict:
+    """Returns the dated embed opening every post"""
+
+    return {
+        "title": f"✧･ﾟ: *✧･ﾟ:* 🎀 {day or date.today()} 🎀 ✧･ﾟ: *✧･ﾟ:*｡",
+        "color": HEADER_COLOR,
+    }
@@ -0,0 +1,131 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator
+
+METRICS_PREFIX = "opportunity_bot"  # Prefix of every OpenMetrics family
+
+
+@dataclass
+class TimerStats:
+    """Struct to hold the measurements of one named timer"""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class Metrics:
+    """Collects the timers and counters of a run, safe to use from worker threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drops every measurement and restarts the run clock"""
+
+        with self.lock:
+            self.started_at = datetime.now(timezone.utc)
+            self.started = time.perf_counter()
+            self.timers: Dict[str, TimerStats] = {}
+            self.counters: Dict[str, float] = {}
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Times the body of the with block under name, even when it raises"""
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.timers.setdefault(name, TimerStats()).add(elapsed)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        """Adds amount to the counter name"""
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> dict:
+        """Returns the structured report of the run so far"""
+
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - self.started, 6),
+                "timers": {
+                    name: asdict(stats) for name, stats in sorted(self.timers.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+    def to_openmetrics(self) -> str:
+        """Returns the report in the OpenMetrics text exposition format"""
+
+        report = self.report()
+        lines = [
+            f"# TYPE {METRICS_PREFIX}_run_seconds gauge",
+            f"{METRICS_PREFIX}_run_seconds {report['duration_seconds']}",
+            f"# TYPE {METRICS_PREFIX}_stage_seconds summary",
+        ]
+
+        for name, stats in report["timers"].items():
+            label = f'{{stage="{name}"}}'
+            lines.append(
+                f"{METRICS_PREFIX}_stage_seconds_count{label} {stats['count']}"
+            )
+            lines.append(
+                f"{METRICS_PREFIX}_stage_seconds_sum{label} {stats['total_seconds']}"
+            )
+
+        for name, value in report["counters"].items():
+            family = f"{METRICS_PREFIX}_{metric_name(name)}"
+            lines.append(f"# TYPE {family} counter")
+            lines.append(f"{family}_total {value}")
+
+        lines.append("# EOF")
+
+        return "\n".join(lines) + "\n"
+
+
+def metric_name(name: str) -> str:
+    """Turns a dotted counter name into a valid OpenMetrics name"""
+
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+METRICS = Metrics()  # Process wide collector every stage reports to
+
+timer = METRICS.timer
+increment = METRICS.increment
+
+
+def write_report(report_path: str = None, openmetrics_path: str = None) -> None:
+    """Prints the JSON run report, or writes it to report_path, and the optional OpenMetrics text"""
+
+    if report_path:
+        with open(report_path, "w") as file:
+            file.write(METRICS.to_json())
+    else:
+        print(METRICS.to_json())
+
+    if openmetrics_path:
+        with open(openmetrics_path, "w") as file:
+            file.write(METRICS.to_openmetrics())
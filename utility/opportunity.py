@@ -1,13 +1,16 @@
-from dataclasses import dataclass
-from dotenv import load_dotenv
-from typing import List
-import utility.db as db
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List
+import utility.storage as storage
+import utility.message as message
+import utility.metrics as metrics
+import utility.ranking as ranking
 from enum import Enum
 import uuid
+import hashlib
+from itertools import chain
+import time
 from datetime import datetime
-import os
-
-load_dotenv()
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 
 class OpportunityType(Enum):
@@ -19,81 +22,261 @@ class OpportunityType(Enum):
     SCHOLARHSHIP = "scholarship"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False)
 class Opportunity:
-    """Struct to hold data for an opportunity"""
+    """
+    Struct to hold data for an opportunity. Slotted and frozen, two opportunities
+    are equal when their fingerprints are, so they can be used in sets and as keys.
+    """
 
-    id: any
     company: str
     title: str
     location: str
     link: str
     processed: bool
     type_of_opportunity: OpportunityType
+    id: any = None  # Only set on opportunities read back from the DB
+    source: str = None  # Name of the registered source that found it
+    _fingerprint: str = field(default=None, init=False, repr=False)
 
+    @property
+    def fingerprint(self) -> str:
+        """Returns the natural key of the opportunity, computed on first access"""
 
-TABLE_NAME = os.getenv("DB_TABLE_NAME")
+        if self._fingerprint is None:
+            object.__setattr__(self, "_fingerprint", opportunity_key(self))
 
+        return self._fingerprint
 
-def ingest_opportunities(job_data: List[Opportunity]) -> None:
-    """Inserts opportunities if and only if they do not already exist"""
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
 
-    supabase = db.SupabaseConnection().CLIENT
-    for job in job_data:
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Opportunity):
+            return NotImplemented
+
+        return self.fingerprint == other.fingerprint
+
+
+# The track of single audience setups, its rows keep the key they had before tracks existed
+DEFAULT_TRACK = "default"
+
+# Rows sent per upsert request, keeps payloads under request-size limits
+INGEST_CHUNK_SIZE = 500
+
+# Ids per status update, ids travel in the URL so this stays smaller
+UPDATE_CHUNK_SIZE = 200
+
+DIGEST_LIMIT = 15  # Unprocessed postings of a type sent per track and digest
+SELECT_PAGE_SIZE = 200  # Rows read per keyset page when streaming the table
+
+# Columns read back into an Opportunity, the key and track are only needed to write
+SELECT_COLUMNS = [
+    "id",
+    "company",
+    "title",
+    "location",
+    "link",
+    "processed",
+    "type",
+    "source",
+    "score",
+]
+
+
+@dataclass
+class IngestResult:
+    """Struct to hold the outcome of an ingestion run"""
+
+    inserted: int = 0
+    skipped: int = 0
+
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "ref",
+    "refid",
+    "trackingid",
+    "trk",
+    "position",
+    "pagenum",
+    "source",
+    "src",
+    "gh_src",
+    "lever-source",
+}
 
-        response = (
-            supabase.table(TABLE_NAME)
-            .select("id, company, title, location, link, processed, type")
-            .eq("company", job.company)
-            .eq("title", job.title)
-            .eq("location", job.location)
-            .eq("link", job.link)
-            .eq("type", job.type_of_opportunity)
-            .execute()
+
+def normalize_text(text: str) -> str:
+    """Folds whitespace and case so cosmetic differences compare equal"""
+
+    return " ".join(str(text or "").split()).casefold()
+
+
+def normalize_link(link: str) -> str:
+    """Returns the canonical form of a link, without tracking parameters or fragment"""
+
+    parts = urlsplit(str(link or "").strip())
+
+    query = [
+        (param, value)
+        for param, value in parse_qsl(parts.query, keep_blank_values=True)
+        if param.lower() not in TRACKING_PARAMS and not param.lower().startswith("utm_")
+    ]
+
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower().removeprefix("www."),
+            parts.path.rstrip("/"),
+            urlencode(query),
+            "",
         )
+    )
+
+
+def opportunity_key(job: Opportunity) -> str:
+    """Returns the deterministic natural key of an opportunity, see Opportunity.fingerprint"""
+
+    fields = [
+        normalize_text(job.company),
+        normalize_text(job.title),
+        normalize_text(job.location),
+        normalize_link(job.link),
+        normalize_text(job.type_of_opportunity),
+    ]
+
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+def track_key(key: str, track: str) -> str:
+    """Returns the row key of a posting within a track, each track has its own processed state"""
+
+    if track == DEFAULT_TRACK:
+        return key
+
+    return hashlib.sha256(f"{key}\x1f{track}".encode("utf-8")).hexdigest()
 
-        if not response.data:
-            request = supabase.table(TABLE_NAME).insert(
-                {
-                    "id": str(uuid.uuid4()),
-                    "company": job.company,
-                    "title": job.title,
-                    "location": job.location,
-                    "link": job.link,
-                    "processed": job.processed,
-                    "type": job.type_of_opportunity,
-                }
-            )
 
-            response = request.execute()
+def ingest_opportunities(
+    job_data: List[Opportunity],
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    track: str = DEFAULT_TRACK,
+) -> IngestResult:
+    """Inserts opportunities of a track if and only if they do not already exist in it"""
+
+    store = storage.get_store()
+    result = IngestResult()
+    now = time.time()
+
+    # Postings repeated within the same batch are collapsed before hitting the DB
+    rows = {}
+    for job in job_data:
+        key = track_key(job.fingerprint, track)
+
+        if key in rows:
+            result.skipped += 1
+            continue
+
+        rows[key] = {
+            # Derived from the key instead of random, so a retried insert keeps its id
+            "id": str(uuid.UUID(key[:32])),
+            "key": key,
+            "company": job.company,
+            "title": job.title,
+            "location": job.location,
+            "link": job.link,
+            "processed": job.processed,
+            "type": job.type_of_opportunity,
+            "track": track,
+            "source": job.source,
+            "score": ranking.score(job, now),
+        }
+
+    rows = list(rows.values())
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+
+        with metrics.timer("db.insert"):
+            inserted = store.insert_new(chunk)
+        result.inserted += inserted
+        result.skipped += len(chunk) - inserted
+
+    metrics.increment("db.inserted", result.inserted)
+    metrics.increment("db.skipped", result.skipped)
+    print(f"Inserted {result.inserted} opportunities, skipped {result.skipped}.")
+
+    return result
 
 
 def list_opportunities(
     debug: bool,
     opp_type: str,
     filtered=False,
-) -> List[Opportunity]:
-    """Lists all oppportunities in DB as well as returns them"""
-
-    supabase = db.SupabaseConnection().CLIENT
+    track: str = DEFAULT_TRACK,
+) -> Iterable[Opportunity]:
+    """
+    Lists the opportunities of a type in DB, best ranked first, as well as returns
+    them. Filtered returns the list of unprocessed ones of the next digest,
+    otherwise an iterator streams every one in pages, the unprocessed ones first.
+    """
 
     if filtered:
-        response = (
-            supabase.table(TABLE_NAME)
-            .select("*")
-            .match({"processed": False, "type": opp_type})
-            .limit(15)
-            .execute()
-        )
+        with metrics.timer("db.select"):
+            rows = storage.get_store().list_opportunities(
+                opp_type,
+                processed=False,
+                limit=DIGEST_LIMIT,
+                track=track,
+                columns=SELECT_COLUMNS,
+            )
     else:
-        response = supabase.table(TABLE_NAME).select("*")
+        # Each status is its own index range, so no page needs sorting
+        rows = chain(
+            iter_opportunity_rows(opp_type, False, track),
+            iter_opportunity_rows(opp_type, True, track),
+        )
+
+        return iter_read_opportunities(rows, debug)
+
+    return read_all_opportunities(rows, debug)
 
-    return read_all_opportunities(response.data, debug)
+
+def iter_opportunity_rows(
+    opp_type: str = None,
+    processed: bool = None,
+    track: str = None,
+    page_size: int = SELECT_PAGE_SIZE,
+) -> Iterator[dict]:
+    """Lazily yields the matching rows best ranked first, one keyset page at a time"""
+
+    store = storage.get_store()
+    after = None
+
+    while True:
+        with metrics.timer("db.select"):
+            rows = store.list_opportunities(
+                opp_type, processed, page_size, track, after, SELECT_COLUMNS
+            )
+
+        yield from rows
+
+        if len(rows) < page_size:
+            return
+
+        # The next page starts right after the last row of this one, an index seek
+        after = (rows[-1]["score"], rows[-1]["id"])
 
 
 def read_all_opportunities(rows, debug_tool: bool) -> List[Opportunity]:
     """Helper function designed to return filtered or unfiltered opportunities"""
-    opportunities = []
+
+    return list(iter_read_opportunities(rows, debug_tool))
+
+
+def iter_read_opportunities(rows, debug_tool: bool) -> Iterator[Opportunity]:
+    """Lazily turns rows into opportunities, rows may be a streamed iterator"""
 
     for row in rows:
         if debug_tool:
@@ -106,49 +289,37 @@ def read_all_opportunities(rows, debug_tool: bool) -> List[Opportunity]:
             print("Type: ", row.get("type"))
             print(" ")
 
-        opportunity = Opportunity(
-            row.get("id"),
+        yield Opportunity(
             row.get("company"),
             row.get("title"),
             row.get("location"),
             row.get("link"),
             row.get("processed"),
             row.get("type"),
+            id=row.get("id"),
+            source=row.get("source"),
         )
 
-        opportunities.append(opportunity)
 
-    return opportunities
+def update_opportunities_status(
+    data_results: List[Opportunity], chunk_size: int = UPDATE_CHUNK_SIZE
+) -> None:
+    """Updates the status of the jobs to processed = 1 after it's been sent by the discord bot"""
 
+    ids = [data_block.id for data_block in data_results if data_block.id is not None]
 
-def update_opportunities_status(data_results: List[Opportunity]) -> None:
-    """Updates the status of the jobs to processed = 1 after it's been sent by the discord bot"""
+    if not ids:
+        return
 
-    supabase = db.SupabaseConnection().CLIENT
-    for data_block in data_results:
-        supabase.table(TABLE_NAME).update({"processed": 1}).match(
-            {
-                "company": data_block.company,
-                "title": data_block.title,
-                "location": data_block.location,
-            }
-        ).execute()
+    store = storage.get_store()
+    for start in range(0, len(ids), chunk_size):
+        with metrics.timer("db.update"):
+            store.mark_processed(ids[start : start + chunk_size])
 
 
 def format_opportunities(data_results: List[Opportunity], formatted_text: str) -> str:
     """Receives data from list_filtered_opporunities() and returns a single string message"""
 
-    formatted_string = ""
-
-    for data_block in data_results:
-        company = data_block.company
-        title = data_block.title
-        location = data_block.location
-        link = data_block.link
-
-        formatted_string += formatted_text.format(
-            company=company, title=title, location=location, link=link
-        )
-        formatted_string += "\n"
-
-    return formatted_string
+    return "".join(
+        line + "\n" for line in message.render_lines(data_results, formatted_text)
+    )
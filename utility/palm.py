@@ -1,18 +1,36 @@
-import google.generativeai as palm
 from time import sleep
 import os
 import utility.utils as utils
-from dotenv import load_dotenv
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
 import json
 from utility.opportunity import Opportunity
+from utility.verdict_cache import VerdictCache
+from utility.config import RunConfig
+import utility.metrics as metrics
 
-load_dotenv()
-utils.verify_set_env_variables()
+MAX_RETRY = 5  # Max number of retrys
+MODEL = "models/text-bison-001"
+CLASSIFY_BATCH_SIZE = 25  # Postings per PaLM request, bounds each response
+CLASSIFY_MAX_WORKERS = 4  # PaLM requests in flight at once
 
+PALM_SDK = None
 
-MAX_RETRY = 5  # Max number of retrys
-palm.configure(api_key=os.getenv("PALM_API_KEY"))
+
+def palm_sdk():
+    """Imports and configures the PaLM SDK on first use, keeping it out of startup"""
+
+    global PALM_SDK
+
+    if PALM_SDK is None:
+        import google.generativeai as palm
+
+        utils.initialize()
+        palm.configure(api_key=os.getenv("PALM_API_KEY"))
+        PALM_SDK = palm
+
+    return PALM_SDK
 
 
 def current_model_inuse() -> any:
@@ -20,7 +38,7 @@ def current_model_inuse() -> any:
 
     models = [
         m
-        for m in palm.list_models()
+        for m in palm_sdk().list_models()
         if "generateText" in m.supported_generation_methods
     ]
 
@@ -63,7 +81,7 @@ def get_parsed_values(prompt: str) -> List[bool]:
     """Function which returns parsed values if the opportunity mathces with the clubs values"""
 
     defaults = {
-        "model": "models/text-bison-001",
+        "model": MODEL,
         "temperature": 0.0,
         "candidate_count": 1,
         "top_k": 100,
@@ -80,40 +98,221 @@ def get_parsed_values(prompt: str) -> List[bool]:
         ],
     }
 
-    completion = palm.generate_text(**defaults, prompt=prompt)
+    completion = palm_sdk().generate_text(**defaults, prompt=prompt)
 
     parsed_values = parse_gpt_values(completion.result)
     return parsed_values
 
 
-def gpt_job_analyze(list_of_opps: List[Opportunity], prompt: str) -> List[Opportunity]:
-    """Analyzes each job opportunity before being inserted into the DB"""
+def build_prompt(list_of_opps: List[Opportunity], prompt: str) -> str:
+    """Appends every opportunity to the prompt"""
+
+    lines = [prompt]
+
+    for opp in list_of_opps:
+        lines.append(f"Company: {opp.company}")
+        lines.append(f"Title: {opp.title}")
+        lines.append(f"Location: {opp.location}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def track_instructions(prompts: Dict[str, str]) -> str:
+    """
+    Returns the instructions asking for a verdict per track, a single track keeps
+    its prompt as is so its answers and cached verdicts stay the same
+    """
+
+    if len(prompts) == 1:
+        return next(iter(prompts.values()))
+
+    lines = [
+        "Assess every posting below against each of the following audiences.",
+        "",
+    ]
+
+    for index, (name, prompt) in enumerate(prompts.items(), start=1):
+        lines.append(f"Audience {index} ({name}): {prompt}")
+
+    lines.append("")
+    lines.append(
+        "Whatever format the audiences ask for, respond with a minified single JSON list "
+        "holding, for every posting in order, a list of booleans (True/False) with one "
+        f"value per audience in the order given ({len(prompts)} values). The list should "
+        "contain only the booleans without any additional comments."
+    )
+
+    return "\n".join(lines)
+
+
+def is_aligned(response, list_of_opps: List[Opportunity], width: int) -> bool:
+    """Determines if a response holds exactly one verdict of width values per posting"""
+
+    if not isinstance(response, list) or len(response) != len(list_of_opps):
+        return False
+
+    return width == 1 or all(
+        isinstance(verdict, list) and len(verdict) == width for verdict in response
+    )
+
+
+def classify_batch(list_of_opps: List[Opportunity], prompt: str) -> list:
+    """Asks PaLM whether each opportunity of a single batch matches the prompt"""
+
+    try:
+        with metrics.timer("llm.request"):
+            return get_parsed_values(build_prompt(list_of_opps, prompt))
+    except (
+        json.decoder.JSONDecodeError
+    ):  # The type of error that would be received is type JSON
+        return []
+
+
+def classify_opportunities(
+    list_of_opps: List[Opportunity],
+    prompt: str,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    max_workers: int = CLASSIFY_MAX_WORKERS,
+    width: int = 1,  # Verdicts expected per posting, one per track
+) -> list:
+    """
+    Classifies opportunities in fixed size batches sent concurrently. A batch whose
+    response does not hold exactly one verdict per posting is retried on its own,
+    batches that never line up are returned as None so no posting is misattributed.
+    """
+
+    batches = [
+        list_of_opps[start : start + batch_size]
+        for start in range(0, len(list_of_opps), batch_size)
+    ]
+    results = [None] * len(batches)
+    pending = list(range(len(batches)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for attempt in range(MAX_RETRY):
+            responses = executor.map(
+                lambda index: classify_batch(batches[index], prompt), pending
+            )
+
+            mismatched = []
+            for index, response in zip(pending, responses):
+                if is_aligned(response, batches[index], width):
+                    results[index] = response
+                else:
+                    mismatched.append(index)
+
+            pending = mismatched
+            if not pending:
+                break
+
+            metrics.increment("llm.retried_batches", len(pending))
+            print(f"Retrying {len(pending)} misaligned batches, attempt {attempt + 1}.")
+            sleep(0.5)
+
+    if pending:
+        metrics.increment("llm.skipped_batches", len(pending))
+        print(f"{len(pending)} batches never returned aligned values and are skipped.")
+
+    return [
+        verdict
+        for batch, result in zip(batches, results)
+        for verdict in (result if result is not None else [None] * len(batch))
+    ]
+
+
+@dataclass
+class TrackAnalysis:
+    """Struct to hold the opportunities each track accepted and the ones left without a verdict"""
+
+    accepted: Dict[str, List[Opportunity]]
+    unclassified: List[Opportunity]
+
+
+def gpt_track_analyze(
+    list_of_opps: List[Opportunity],
+    prompts: Dict[str, str],  # Prompt per track name
+    config: RunConfig = RunConfig(),
+) -> TrackAnalysis:
+    """
+    Analyzes each opportunity for every track in one pass, each posting is sent
+    once with all the tracks' prompts, and returns the opportunities each track
+    accepted along with the ones PaLM skipped
+    """
+
+    if not list_of_opps:
+        return TrackAnalysis({name: [] for name in prompts}, [])
+
+    utils.initialize()
 
     print(
         f"The type '{list_of_opps[0].type_of_opportunity}' original length before filtering: {len(list_of_opps)}"
     )
 
-    for opp in list_of_opps:
-        prompt += f"\nCompany: {opp.company}"
-        prompt += f"\nTitle: {opp.title}"
-        prompt += f"\nLocation: {opp.location}"
-        prompt += "\n"
+    # Postings classified on previous runs are answered from the cache, only misses reach PaLM
+    cache = VerdictCache()
+    keys = {
+        name: [
+            cache.key(opp.company, opp.title, opp.location, prompt, MODEL)
+            for opp in list_of_opps
+        ]
+        for name, prompt in prompts.items()
+    }
+    verdicts = cache.get_many(key for track_keys in keys.values() for key in track_keys)
 
-    parsed_values = []
-    for _ in range(MAX_RETRY):  # Keep looping until a valid prompt is received
-        try:
-            parsed_values = get_parsed_values(prompt)
+    missed = [
+        index
+        for index in range(len(list_of_opps))
+        if any(track_keys[index] not in verdicts for track_keys in keys.values())
+    ]
+    metrics.increment("llm.cache_hits", len(list_of_opps) - len(missed))
+    metrics.increment("llm.cache_misses", len(missed))
+    print(
+        f"Cached verdicts: {len(list_of_opps) - len(missed)}, sent to PaLM: {len(missed)}"
+    )
 
-            if len(parsed_values) == 0:
+    if missed:
+        parsed_values = classify_opportunities(
+            [list_of_opps[index] for index in missed],
+            track_instructions(prompts),
+            config.classify_batch_size or CLASSIFY_BATCH_SIZE,
+            config.classify_max_workers or CLASSIFY_MAX_WORKERS,
+            len(prompts),
+        )
+
+        # Only verdicts PaLM actually returned are kept, skipped batches are retried next run
+        new_verdicts = []
+        for index, value in zip(missed, parsed_values):
+            if value is None:
                 continue
-            break
-        except (
-            json.decoder.JSONDecodeError
-        ):  # The type of error that would be received is type JSON
-            sleep(0.5)
 
-    print(f" Below are the parsed values from GPT - {parsed_values}")
+            values = value if len(prompts) > 1 else [value]
+            for track_keys, track_value in zip(keys.values(), values):
+                new_verdicts.append((track_keys[index], bool(track_value)))
+
+        cache.set_many(new_verdicts)
+        verdicts.update(new_verdicts)
+
+    cache.close()
+
+    accepted = {
+        name: filter_out_opportunities(
+            list_of_opps, [verdicts.get(key, False) for key in track_keys]
+        )
+        for name, track_keys in keys.items()
+    }  # Returns filtered out opportunities
+    unclassified = [
+        opp
+        for index, opp in enumerate(list_of_opps)
+        if any(track_keys[index] not in verdicts for track_keys in keys.values())
+    ]
+
+    return TrackAnalysis(accepted, unclassified)
+
+
+def gpt_job_analyze(
+    list_of_opps: List[Opportunity], prompt: str, config: RunConfig = RunConfig()
+) -> List[Opportunity]:
+    """Analyzes each job opportunity before being inserted into the DB"""
 
-    return filter_out_opportunities(
-        list_of_opps, parsed_values
-    )  # Returns filtered out opportunities
+    return gpt_track_analyze(list_of_opps, {"": prompt}, config).accepted[""]
@@ -0,0 +1,249 @@
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Iterator, List
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+# Supported backends, fastest first. A backend whose package is not installed
+# falls back to the next one, selectolax is optional and lxml is the usual pick.
+PARSER_BACKENDS = ["selectolax", "lxml", "html.parser"]
+DEFAULT_PARSER_BACKEND = "selectolax"
+
+
+@dataclass(frozen=True)
+class CardSelectors:
+    """Struct to hold the classes locating a posting card and its fields"""
+
+    card: str  # Full class attribute of the card div
+    company: str
+    title: str
+    location: str
+    link: str
+
+
+@lru_cache(maxsize=None)
+def parser_backend(requested: str = None) -> str:
+    """Returns the requested (or HTML_PARSER configured) backend that is installed"""
+
+    requested = requested or os.getenv("HTML_PARSER", DEFAULT_PARSER_BACKEND)
+    if requested not in PARSER_BACKENDS:
+        requested = DEFAULT_PARSER_BACKEND
+
+    for backend in PARSER_BACKENDS[PARSER_BACKENDS.index(requested) :]:
+        if backend == "html.parser" or find_spec(backend) is not None:
+            return backend
+
+
+@lru_cache(maxsize=None)
+def compile_fields(selectors: CardSelectors) -> dict:
+    """Precompiles the CSS selectors of every card field once per set of selectors"""
+
+    import soupsieve
+
+    return {
+        "company": soupsieve.compile(f".{selectors.company}"),
+        "title": soupsieve.compile(f".{selectors.title}"),
+        "location": soupsieve.compile(f".{selectors.location}"),
+        "link": soupsieve.compile(f".{selectors.link}"),
+        "time": soupsieve.compile("time"),
+    }
+
+
+def class_xpath(class_name: str) -> str:
+    """Translates a .class_name CSS selector into its XPath equivalent"""
+
+    return f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')][1]"
+
+
+@lru_cache(maxsize=None)
+def compile_xpaths(selectors: CardSelectors) -> dict:
+    """Precompiles the XPath expressions used by the lxml backend"""
+
+    from lxml.etree import XPath
+
+    return {
+        "card": XPath(f'//div[@class="{selectors.card}"]'),
+        "company": XPath(class_xpath(selectors.company)),
+        "title": XPath(class_xpath(selectors.title)),
+        "location": XPath(class_xpath(selectors.location)),
+        "link": XPath(class_xpath(selectors.link)),
+        "time": XPath(".//time[1]"),
+    }
+
+
+def parse_content(content: str, parse_only: "SoupStrainer" = None) -> "BeautifulSoup":
+    """Parses content into a BeautifulSoup tree with the fastest available tree builder"""
+
+    from bs4 import BeautifulSoup
+
+    features = "html.parser" if parser_backend() == "html.parser" else "lxml"
+
+    return BeautifulSoup(content, features, parse_only=parse_only)
+
+
+def extract_cards(content, selectors: CardSelectors) -> Iterator[dict]:
+    """
+    Yields the raw fields of every posting card. Raw html goes through the configured
+    backend, html.parser only builds the card subtrees, while an already parsed soup
+    is searched as is.
+    """
+
+    backend = parser_backend()
+
+    if isinstance(content, str) and backend == "selectolax":
+        yield from extract_selectolax_cards(content, selectors)
+        return
+
+    if isinstance(content, str) and backend == "lxml":
+        yield from extract_lxml_cards(content, selectors)
+        return
+
+    if isinstance(content, str):
+        from bs4 import SoupStrainer
+
+        content = parse_content(content, SoupStrainer("div", class_=selectors.card))
+
+    fields = compile_fields(selectors)
+
+    for card in content.find_all("div", class_=selectors.card):
+        company = fields["company"].select_one(card)
+        title = fields["title"].select_one(card)
+        location = fields["location"].select_one(card)
+        link = fields["link"].select_one(card)
+        time = fields["time"].select_one(card)
+
+        yield {
+            "company": company.get_text().strip() if company else None,
+            "title": title.get_text().strip() if title else None,
+            "location": location.get_text().strip() if location else None,
+            "link": link.get("href") if link else None,
+            "datetime": time.get("datetime") if time else None,
+        }
+
+
+def extract_lxml_cards(content: str, selectors: CardSelectors) -> Iterator[dict]:
+    """Card extraction for the lxml backend, skips building a BeautifulSoup tree entirely"""
+
+    import lxml.html
+
+    if not content.strip():
+        return
+
+    xpaths = compile_xpaths(selectors)
+    tree = lxml.html.document_fromstring(content)
+
+    for card in xpaths["card"](tree):
+        company = xpaths["company"](card)
+        title = xpaths["title"](card)
+        location = xpaths["location"](card)
+        link = xpaths["link"](card)
+        time = xpaths["time"](card)
+
+        yield {
+            "company": company[0].text_content().strip() if company else None,
+            "title": title[0].text_content().strip() if title else None,
+            "location": location[0].text_content().strip() if location else None,
+            "link": link[0].get("href") if link else None,
+            "datetime": time[0].get("datetime") if time else None,
+        }
+
+
+def extract_selectolax_cards(content: str, selectors: CardSelectors) -> Iterator[dict]:
+    """Card extraction for the selectolax backend"""
+
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(content)
+
+    for card in tree.css(f'div[class="{selectors.card}"]'):
+        company = card.css_first(f".{selectors.company}")
+        title = card.css_first(f".{selectors.title}")
+        location = card.css_first(f".{selectors.location}")
+        link = card.css_first(f".{selectors.link}")
+        time = card.css_first("time")
+
+        yield {
+            "company": company.text().strip() if company else None,
+            "title": title.text().strip() if title else None,
+            "location": location.text().strip() if location else None,
+            "link": link.attributes.get("href") if link else None,
+            "datetime": time.attributes.get("datetime") if time else None,
+        }
+
+
+# ----------------- MARKDOWN TABLES -----------------
+
+MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\(([^)\s]+)[^)]*\)")
+HTML_HREF = re.compile(r'href="([^"]+)"')
+HTML_BREAK = re.compile(r"<br\s*/?>|</br>", re.IGNORECASE)
+HTML_TAG = re.compile(r"<[^>]+>")
+HTML_SUMMARY = re.compile(r"<summary>.*?</summary>", re.IGNORECASE)
+TABLE_SEPARATOR = re.compile(r"^:?-{3,}:?$")
+
+# Leading header cells of the table listing the postings, other tables are skipped
+POSTINGS_TABLE_HEADER = ["company", "role", "location"]
+
+
+def raw_readme_url(url: str) -> str:
+    """Returns the raw README url of a github.com repository url"""
+
+    parts = urlsplit(url)
+    if parts.netloc != "github.com":
+        return url  # Already a raw file
+
+    owner, repo = parts.path.strip("/").split("/")[:2]
+
+    return f"https://raw.githubusercontent.com/{owner}/{repo}/HEAD/README.md"
+
+
+def markdown_table_cells(line: str) -> List[str]:
+    """Splits a markdown table row into its cells, other lines return no cells"""
+
+    line = line.strip()
+    if not line.startswith("|"):
+        return []
+
+    return [cell.strip() for cell in line.strip("|").split("|")]
+
+
+def is_markdown_table_header(cells: List[str]) -> bool:
+    """Determines if the cells belong to a header or separator row"""
+
+    return cells[0].lower() == "company" or all(
+        TABLE_SEPARATOR.match(cell) for cell in cells
+    )
+
+
+def is_postings_table_header(cells: List[str]) -> bool:
+    """Determines if the cells are the header row of the postings table"""
+
+    return [
+        markdown_text(cell).lower() for cell in cells[: len(POSTINGS_TABLE_HEADER)]
+    ] == POSTINGS_TABLE_HEADER
+
+
+def markdown_text(cell: str) -> str:
+    """Returns the plain text of a markdown/html table cell"""
+
+    text = HTML_SUMMARY.sub("", cell)  # "**4 locations**" style summaries of a list
+    text = MARKDOWN_LINK.sub(r"\1", text)
+    text = HTML_BREAK.sub(", ", text)
+    text = HTML_TAG.sub(" ", text)
+    text = text.replace("**", "").replace("__", "")
+
+    return " ".join(text.split()).strip(" ,")
+
+
+def markdown_link(cell: str) -> str:
+    """Returns the first link of a markdown/html table cell"""
+
+    match = HTML_HREF.search(cell) or MARKDOWN_LINK.search(cell)
+    if not match:
+        return None
+
+    return match.group(1) if match.re is HTML_HREF else match.group(2)
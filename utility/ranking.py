@@ -0,0 +1,37 @@
+import re
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from utility.opportunity import Opportunity
+
+HOUR = 60 * 60
+
+# Hours of freshness a posting from each source is worth, curated lists rank above searches
+SOURCE_BOOSTS = {
+    "github_internships": 12,
+    "indeed_jobs": -6,
+}
+
+# Hours of freshness a title aimed at students and new graduates is worth
+AUDIENCE_FIT_BOOST = 24
+AUDIENCE_FIT_TITLE = re.compile(
+    r"(?<!\w)(intern|internship|co-op|new grad|graduate|entry level|junior|university|early career)(?!\w)",
+    re.IGNORECASE,
+)
+
+
+def score(opportunity: "Opportunity", now: float = None) -> float:
+    """
+    Returns the rank of a posting, the time it was found at shifted by its source
+    and audience fit boosts. Scores never change once stored, so they can be
+    indexed and paged through with keyset cursors.
+    """
+
+    now = time.time() if now is None else now
+    hours = SOURCE_BOOSTS.get(opportunity.source, 0)
+
+    if AUDIENCE_FIT_TITLE.search(opportunity.title or ""):
+        hours += AUDIENCE_FIT_BOOST
+
+    return now + hours * HOUR
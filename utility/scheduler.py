@@ -0,0 +1,62 @@
+import asyncio
+import random
+import signal
+from typing import Awaitable, Callable
+
+POLL_JITTER = 0.1  # Fraction of an interval randomly added or taken away
+STARTUP_SPREAD = 5.0  # Seconds over which the first polls are spread out
+
+
+def jittered(interval: float, jitter: float = POLL_JITTER) -> float:
+    """Returns interval randomly spread by up to jitter of itself"""
+
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def stop_on_signals(stop: asyncio.Event) -> None:
+    """Sets stop on SIGINT and SIGTERM, so running jobs finish before shutting down"""
+
+    loop = asyncio.get_running_loop()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            pass  # Windows has no signal handlers in asyncio, Ctrl+C still interrupts
+
+
+async def sleep_until_stopped(stop: asyncio.Event, seconds: float) -> bool:
+    """Sleeps for seconds and returns True if stop was set in the meantime"""
+
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def run_every(
+    name: str,
+    interval: float,
+    job: Callable[[], Awaitable[None]],
+    stop: asyncio.Event,
+    jitter: float = POLL_JITTER,
+    initial_delay: float = None,
+) -> None:
+    """
+    Runs job every jittered interval seconds until stop is set. A failing run is
+    logged and the next one still happens. The first run waits initial_delay,
+    by default a random part of STARTUP_SPREAD.
+    """
+
+    delay = (
+        random.uniform(0, STARTUP_SPREAD) if initial_delay is None else initial_delay
+    )
+
+    while not await sleep_until_stopped(stop, delay):
+        try:
+            await job()
+        except Exception as e:
+            print(f"Scheduled job '{name}' failed: {e}")
+
+        delay = jittered(interval, jitter)
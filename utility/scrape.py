@@ -1,151 +1,335 @@
 from utility.opportunity import Opportunity, OpportunityType
-from typing import List
+from utility.fetch import AsyncFetcher
+from utility.config import RunConfig
+from utility.sources import SOURCES, Source, gather_sources, register_source
+from typing import AsyncIterator, List
 import utility.utils as utils
+import utility.parser as parser
+import utility.watermark as watermark
+import utility.metrics as metrics
+import asyncio
 import os
-from dotenv import load_dotenv
 import re
-import requests
-import uuid
-from time import sleep
 
-load_dotenv()
-utils.verify_set_env_variables()
+MAX_RETRY = 3  # Attempts at refetching a page that came back empty
+RETRY_BACKOFF = 0.5  # Seconds before the first refetch, doubled on every attempt
 
-MAX_OPPORTUNITY_LIST_LENGTH = 10
+LINKEDIN_PAGE_SIZE = 25  # Postings LinkedIn returns per start= offset
+LINKEDIN_MAX_PAGES = 10  # Upper bound of pages walked per search
+LINKEDIN_CONCURRENCY = 3  # Result pages fetched at once
+LINKEDIN_INTERVAL = 15 * 60  # Seconds between polls in --daemon mode
+LINKEDIN_CARD_CLASS = "base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card"
+
+RAPID_API_HOST = "indeed12.p.rapidapi.com"
 
 # ----------------- INTERNSHIP DATA -----------------
 
 
-def request_github_internship24_data() -> List[Opportunity]:
+@register_source(
+    "github_internships",
+    OpportunityType.INTERNSHIP.value,
+    timeout=20,
+    interval=60 * 60,
+    max_items=10,
+    requires=["GH_INTERN24_URL"],
+)
+async def fetch_github_internship24_data(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> List[Opportunity]:
     """Scrapes Internship Data '24 from Github Repo"""
 
     github_list = []
-
-    url = os.getenv("GH_INTERN24_URL")
-    parse_content = utils.content_parser(url)
-    td_elems = parse_content.find_all("tr")
-
-    for cell in td_elems[10:]:
-        if len(github_list) <= MAX_OPPORTUNITY_LIST_LENGTH:
-            elements = cell.find_all("td")
-            company = elements[0].text
-            title = elements[1].text
-            location = elements[2].text
-            link = elements[3]
-            if "🔒" not in link.text:
-                opportunity = Opportunity(
-                    uuid.uuid4(),
+    company = None
+    known_streak = 0
+    in_postings_table = False
+    truncated = False
+
+    url = parser.raw_readme_url(os.getenv("GH_INTERN24_URL"))
+    mark = watermark.get_watermarks().begin(url)
+    headers = mark.conditional_headers() if config.incremental else None
+
+    # Without validators the last walk was cut short, its unread rows may sit below known ones
+    stop_at_known = bool(headers)
+
+    # The README is streamed line by line and the download stops as soon as the list is full
+    async with fetcher.stream(url, headers) as response:
+        if response.status_code == 304:
+            print("GitHub internship list is unchanged since the last run.")
+            return []
+
+        validators = response.headers
+
+        async for line in response.aiter_lines():
+            cells = parser.markdown_table_cells(line)
+
+            # Only rows of the postings table are postings, the README has other tables too
+            if not in_postings_table:
+                in_postings_table = parser.is_postings_table_header(cells)
+                continue
+            if not cells:
+                break
+            if len(cells) < 4 or parser.is_markdown_table_header(cells):
+                continue
+
+            # "↳" rows are additional roles of the company in the row above
+            if cells[0].strip() != "↳":
+                company = parser.markdown_text(cells[0])
+
+            link = parser.markdown_link(cells[3])
+            if "🔒" in cells[3] or not company or not link:
+                continue
+
+            # New rows are added at the top, a run of known rows means the rest is known too
+            if config.incremental and mark.has_seen(link):
+                known_streak += 1
+                if stop_at_known and known_streak >= watermark.KNOWN_STREAK_LIMIT:
+                    break
+                continue
+
+            known_streak = 0
+            github_list.append(
+                Opportunity(
                     company,
-                    title,
-                    location,
-                    link.find("a")["href"],
+                    parser.markdown_text(cells[1]),
+                    parser.markdown_text(cells[2]),
+                    link,
                     False,
                     OpportunityType.INTERNSHIP.value,
                 )
-                github_list.append(opportunity)
+            )
+
+            if len(github_list) == source.max_items:
+                truncated = True
+                break
+
+    # Both only count once the postings are stored, so skipped ones are scraped again
+    mark.stage_links(opportunity.link for opportunity in github_list)
+
+    # A walk cut short by the cap left rows unread, which a 304 would skip next run
+    if truncated:
+        mark.drop_validators()
+    else:
+        mark.stage_validators(validators)
 
     return github_list
 
 
-def request_linkedin_internship24_data() -> List[Opportunity]:
+@register_source(
+    "linkedin_internships",
+    OpportunityType.INTERNSHIP.value,
+    concurrency=LINKEDIN_CONCURRENCY,
+    interval=LINKEDIN_INTERVAL,
+    requires=["LINKEDIN_INTERN_URL"],
+)
+async def fetch_linkedin_internship24_data(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> AsyncIterator[Opportunity]:
     """Web scrapes Summer '24 Internship Opportunities using LinkedIn"""
 
     url = os.getenv("LINKEDIN_INTERN_URL")
-    parse_content = utils.content_parser(url)
-
-    linkedin_internship_opps = utils.blueprint_opportunity_formatter(
-        parse_content,
-        "base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card",
-        "hidden-nested-link",
-        "base-search-card__title",
-        "job-search-card__location",
-        "base-card__full-link",
-        True,
-        MAX_OPPORTUNITY_LIST_LENGTH,
-        OpportunityType.INTERNSHIP.value,
-    )
 
-    return linkedin_internship_opps
+    # Yielded page by page, so the pages parsed before the source's timeout are kept
+    async for opportunity in paginate_linkedin(fetcher, url, config, source):
+        yield opportunity
 
 
 # ----------------- JOB DATA -----------------
 
 
-def request_rapidapi_indeed_data() -> List[Opportunity]:
+@register_source(
+    "indeed_jobs",
+    OpportunityType.FULL_TIME.value,
+    timeout=20,
+    interval=2 * 60 * 60,
+    max_items=10,
+    requires=["RAPID_API_URL", "RAPID_API_KEY"],
+)
+async def fetch_rapidapi_indeed_data(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> List[Opportunity]:
     """
     This API call retrieves a formatted response object
     and returns a List[Opportunity] as the result
     """
 
     url = os.getenv("RAPID_API_URL")
-    rapid_api_key = os.getenv("RAPID_API_KEY")
 
     headers = {
-        "X-RapidAPI-Key": rapid_api_key,
-        "X-RapidAPI-Host": "indeed12.p.rapidapi.com",
+        "X-RapidAPI-Key": os.getenv("RAPID_API_KEY"),
+        "X-RapidAPI-Host": RAPID_API_HOST,
     }
 
-    rapid_jobs = []
-    response = requests.get(url, headers=headers).json()
-
-    days_needed_command_value = utils.extract_command_value().days_needed[
-        0
-    ]  # Extracts command-line value
+    response = await fetcher.get(url, headers)
+    response.raise_for_status()
 
-    for elem in response["hits"]:
-        time = elem["formatted_relative_time"]
+    rapid_jobs = []
 
-        numeric = re.search(r"\d+", time)
+    for elem in response.json().get("hits", []):
+        # "Just posted", "Today" and "3 days ago" all come as formatted_relative_time
+        numeric = re.search(r"\d+", elem.get("formatted_relative_time", ""))
         formatted_time_integer = int(numeric.group()) if numeric else 0
 
-        if (
-            len(rapid_jobs) < MAX_OPPORTUNITY_LIST_LENGTH
-            and int(days_needed_command_value) >= formatted_time_integer
-        ):
-            company = elem["company_name"]
-            title = elem["title"]
-            location = elem["location"]
-            link = f'https://www.indeed.com/viewjob?jk={elem["id"]}&locality=us'
-            processed = False
-
-            opportunity = Opportunity(
-                company,
-                title,
-                location,
-                link,
-                processed,
-                OpportunityType.FULL_TIME.value,
+        if formatted_time_integer > config.days_needed:
+            continue
+
+        rapid_jobs.append(
+            Opportunity(
+                elem["company_name"],
+                elem["title"],
+                elem["location"],
+                f'https://www.indeed.com/viewjob?jk={elem["id"]}&locality=us',
+                False,
+                source.opp_type,
             )
+        )
 
-            rapid_jobs.append(opportunity)
+        if len(rapid_jobs) == source.max_items:
+            break
 
     return rapid_jobs
 
 
-def request_linkedin_data() -> List[Opportunity]:
-    """Returns a List[Opportunity] which contains web scraped job content"""
+@register_source(
+    "linkedin_jobs",
+    OpportunityType.FULL_TIME.value,
+    concurrency=LINKEDIN_CONCURRENCY,
+    interval=LINKEDIN_INTERVAL,
+    requires=["LINKEDIN_URL"],
+)
+async def fetch_linkedin_data(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> AsyncIterator[Opportunity]:
+    """Yields the Opportunity objects of web scraped job content"""
 
     url = os.getenv("LINKEDIN_URL")
-    parse_content = utils.content_parser(url)
-
-    MAX_RETRY = 5
-
-    for _ in range(MAX_RETRY):
-        linked_in_jobs = utils.blueprint_opportunity_formatter(
-            parse_content,
-            "base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card",
-            "hidden-nested-link",
-            "base-search-card__title",
-            "job-search-card__location",
-            "base-card__full-link",
-            True,
-            MAX_OPPORTUNITY_LIST_LENGTH,
-            OpportunityType.FULL_TIME.value,
-        )
 
-        if linked_in_jobs:
+    # Yielded page by page, so the pages parsed before the source's timeout are kept
+    async for opportunity in paginate_linkedin(fetcher, url, config, source):
+        yield opportunity
+
+
+# ----------------- LINKEDIN PAGINATION -----------------
+
+
+async def fetch_linkedin_page(fetcher: AsyncFetcher, url: str) -> str:
+    """Fetches a results page, refetching with backoff while LinkedIn returns no postings"""
+
+    for attempt in range(MAX_RETRY):
+        content = await fetcher.get_text(url)
+
+        # A substring check avoids parsing the page twice just to find out it's empty
+        if f'class="{LINKEDIN_CARD_CLASS}"' in content:
             break
 
-        sleep(0.5)
+        if attempt < MAX_RETRY - 1:
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+
+    return content
+
+
+async def paginate_linkedin(
+    fetcher: AsyncFetcher,
+    url: str,
+    config: RunConfig,
+    source: Source,
+) -> AsyncIterator[Opportunity]:
+    """
+    Lazily yields opportunities while walking LinkedIn's start= offsets, the
+    source's concurrency of pages is fetched at once and parsed in order
+    """
+
+    # LinkedIn pages carry no validators, so only the links of earlier runs mark progress
+    mark = watermark.get_watermarks().begin(url)
+
+    first_page = 0
+
+    while first_page < LINKEDIN_MAX_PAGES:
+        # Incremental runs after the first one mostly stop at page one, so it is fetched alone
+        window = (
+            1
+            if first_page == 0 and config.incremental and mark.links
+            else source.concurrency
+        )
+        pages = range(first_page, min(first_page + window, LINKEDIN_MAX_PAGES))
+        first_page += len(pages)
+
+        contents = await asyncio.gather(
+            *(
+                fetch_linkedin_page(
+                    fetcher, utils.paginate_url(url, "start", page * LINKEDIN_PAGE_SIZE)
+                )
+                for page in pages
+            )
+        )
+        metrics.increment("fetch.linkedin_pages", len(contents))
+
+        for content in contents:
+            with metrics.timer("parse.linkedin"):
+                found = list(
+                    utils.iter_blueprint_opportunities(
+                        content,
+                        LINKEDIN_CARD_CLASS,
+                        "hidden-nested-link",
+                        "base-search-card__title",
+                        "job-search-card__location",
+                        "base-card__full-link",
+                        True,
+                        source.opp_type,
+                        config.days_needed,
+                    )
+                )
+
+            fresh = [
+                opportunity
+                for opportunity in found
+                if not (config.incremental and mark.has_seen(opportunity.link))
+            ]
+            mark.stage_links(opportunity.link for opportunity in fresh)
+
+            for opportunity in fresh:
+                yield opportunity
+
+            # An empty page means we ran out of results, a page without any recent
+            # postings means every following page is older than --days-needed and
+            # a page of only known postings means the rest was walked by earlier runs
+            if not fresh:
+                return
+
+
+# ----------------- SYNCHRONOUS WRAPPERS -----------------
+
+
+def request_source(name: str, config: RunConfig = RunConfig()) -> List[Opportunity]:
+    """Runs the registered source name on its own and returns its opportunities"""
+
+    utils.initialize()
+
+    return asyncio.run(gather_sources(SOURCES[name], config=config))[0]
+
+
+def request_github_internship24_data(
+    config: RunConfig = RunConfig(),
+) -> List[Opportunity]:
+    """Synchronous wrapper around fetch_github_internship24_data()"""
+
+    return request_source("github_internships", config)
+
+
+def request_linkedin_internship24_data(
+    config: RunConfig = RunConfig(),
+) -> List[Opportunity]:
+    """Synchronous wrapper around fetch_linkedin_internship24_data()"""
+
+    return request_source("linkedin_internships", config)
+
+
+def request_linkedin_data(config: RunConfig = RunConfig()) -> List[Opportunity]:
+    """Synchronous wrapper around fetch_linkedin_data()"""
+
+    return request_source("linkedin_jobs", config)
+
+
+def request_rapidapi_indeed_data(config: RunConfig = RunConfig()) -> List[Opportunity]:
+    """Synchronous wrapper around fetch_rapidapi_indeed_data()"""
 
-    return linked_in_jobs
+    return request_source("indeed_jobs", config)
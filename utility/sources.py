@@ -0,0 +1,207 @@
+import asyncio
+import importlib
+import inspect
+import os
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Union
+import utility.metrics as metrics
+import utility.watermark as watermark
+from utility.blocklist import get_blocklist
+from utility.config import RunConfig
+from utility.fetch import AsyncFetcher
+from utility.opportunity import Opportunity
+
+SOURCE_TIMEOUT = 30  # Seconds a source may take, a yielding one keeps what it found
+SOURCE_CONCURRENCY = 1  # Requests a source keeps in flight unless it declares more
+SOURCE_INTERVAL = 30 * 60  # Seconds between polls of a source in --daemon mode
+
+# Modules whose sources are registered on import
+SOURCE_MODULES = ["utility.scrape"]
+
+
+@dataclass(frozen=True)
+class Source:
+    """Struct to hold a registered source of opportunities and its limits"""
+
+    name: str
+    # Downloads and parses the source in one pass, or yields as it goes to keep partial results
+    fetch: Callable[
+        [AsyncFetcher, RunConfig, "Source"],
+        Union[Awaitable[List[Opportunity]], AsyncIterator[Opportunity]],
+    ]
+    opp_type: str
+    concurrency: int = SOURCE_CONCURRENCY
+    timeout: float = SOURCE_TIMEOUT
+    interval: float = SOURCE_INTERVAL
+    max_items: int = None  # Opportunities kept per run, None keeps them all
+    requires: List[str] = field(default_factory=list)  # Env variables it needs
+
+    def is_configured(self) -> bool:
+        return all(os.getenv(variable) for variable in self.requires)
+
+
+SOURCES: Dict[str, Source] = {}
+
+
+def register_source(
+    name: str,
+    opp_type: str,
+    concurrency: int = SOURCE_CONCURRENCY,
+    timeout: float = SOURCE_TIMEOUT,
+    interval: float = SOURCE_INTERVAL,
+    max_items: int = None,
+    requires: List[str] = None,
+):
+    """
+    Decorator registering an async fetch function as a source under name, an
+    async generator keeps what it yielded before its timeout
+    """
+
+    def register(fetch):
+        if name in SOURCES:
+            raise ValueError(f"Source '{name}' is already registered.")
+
+        SOURCES[name] = Source(
+            name,
+            fetch,
+            opp_type,
+            concurrency,
+            timeout,
+            interval,
+            max_items,
+            requires or [],
+        )
+
+        return fetch
+
+    return register
+
+
+def discover_sources() -> Dict[str, Source]:
+    """Imports every module of SOURCE_MODULES and returns the registered sources"""
+
+    for module in SOURCE_MODULES:
+        importlib.import_module(module)
+
+    return SOURCES
+
+
+def enabled_sources() -> List[Source]:
+    """
+    Returns the sources listed in the comma separated SOURCES env variable, or
+    every registered source whose env variables are set when it is empty
+    """
+
+    sources = discover_sources()
+    names = [
+        name.strip() for name in os.getenv("SOURCES", "").split(",") if name.strip()
+    ]
+
+    if not names:
+        return [source for source in sources.values() if source.is_configured()]
+
+    unknown = [name for name in names if name not in sources]
+    if unknown:
+        raise EnvironmentError(f"Unknown sources in SOURCES: {', '.join(unknown)}.")
+
+    missing = [name for name in names if not sources[name].is_configured()]
+    if missing:
+        raise EnvironmentError(
+            f"Sources missing their env variables: {', '.join(missing)}."
+        )
+
+    return [sources[name] for name in names]
+
+
+async def collect_source(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> List[Opportunity]:
+    """Drains a source that yields its opportunities, keeping those found before its timeout"""
+
+    collected = []
+    opportunities = source.fetch(fetcher, config, source)
+
+    async def drain():
+        async for opportunity in opportunities:
+            collected.append(opportunity)
+
+    try:
+        await asyncio.wait_for(drain(), source.timeout)
+    except asyncio.TimeoutError:
+        metrics.increment(f"fetch.{source.name}.timeouts")
+        print(
+            f"Source '{source.name}' timed out after {source.timeout} seconds, keeping {len(collected)} opportunities."
+        )
+    finally:
+        await opportunities.aclose()
+
+    return collected
+
+
+async def run_source(
+    fetcher: AsyncFetcher, config: RunConfig, source: Source
+) -> List[Opportunity]:
+    """Runs a single source within its timeout, a failing source yields no opportunities"""
+
+    try:
+        with metrics.timer(f"fetch.{source.name}"):
+            if inspect.isasyncgenfunction(source.fetch):
+                opportunities = await collect_source(fetcher, config, source)
+            else:
+                opportunities = await asyncio.wait_for(
+                    source.fetch(fetcher, config, source), source.timeout
+                )
+
+        # Tagged with the source that found them, which the ranking weighs
+        opportunities = [
+            replace(opportunity, source=source.name) for opportunity in opportunities
+        ]
+
+        # Every source goes through the same prefilter, so obvious rejects never reach PaLM
+        with metrics.timer("prefilter"):
+            kept = get_blocklist().filter(opportunities)
+
+        # Rejected postings are settled, so the next scrape may stop at them
+        kept_links = {opportunity.link for opportunity in kept}
+        watermark.get_watermarks().confirm(
+            opportunity.link
+            for opportunity in opportunities
+            if opportunity.link not in kept_links
+        )
+        opportunities = kept
+
+        opportunities = opportunities[: source.max_items]
+        metrics.increment(f"scraped.{source.name}", len(opportunities))
+        return opportunities
+    except asyncio.TimeoutError:
+        metrics.increment(f"fetch.{source.name}.timeouts")
+        print(f"Source '{source.name}' timed out after {source.timeout} seconds.")
+    except Exception as e:
+        metrics.increment(f"fetch.{source.name}.failures")
+        print(f"Source '{source.name}' failed: {e}")
+
+    return []
+
+
+async def gather_sources(
+    *sources: Source, config: RunConfig = RunConfig()
+) -> List[List[Opportunity]]:
+    """Runs every source concurrently over one shared client, results keep the order of sources"""
+
+    async with AsyncFetcher() as fetcher:
+        return await asyncio.gather(
+            *(run_source(fetcher, config, source) for source in sources)
+        )
+
+
+def group_by_type(
+    sources: List[Source], results: List[List[Opportunity]]
+) -> Dict[str, List[Opportunity]]:
+    """Merges the results of sources into one list per opportunity type"""
+
+    grouped = {}
+
+    for source, opportunities in zip(sources, results):
+        grouped.setdefault(source.opp_type, []).extend(opportunities)
+
+    return grouped
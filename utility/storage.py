@@ -0,0 +1,302 @@
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+import utility.db as db
+from dotenv import load_dotenv
+
+STORAGE_BACKEND = "supabase"  # Either supabase or sqlite
+SQLITE_DB_PATH = "opportunities.sqlite3"
+SQLITE_MAX_VARIABLES = 500  # Ids bound per IN (...) statement
+
+COLUMNS = [
+    "id",
+    "key",
+    "company",
+    "title",
+    "location",
+    "link",
+    "processed",
+    "type",
+    "track",
+    "source",
+    "score",
+]
+
+# Columns added after the first release, SQLite files created before them get them on open
+MIGRATED_COLUMNS = {
+    "track": "TEXT NOT NULL DEFAULT 'default'",
+    "source": "TEXT",
+    "score": "REAL NOT NULL DEFAULT 0",
+}
+
+
+class OpportunityStore(ABC):
+    """Interface every storage backend of the opportunities table implements"""
+
+    @abstractmethod
+    def describe(self) -> str:
+        """Returns where the opportunities are stored, for messages to the user"""
+
+    @abstractmethod
+    def create_table(self) -> None:
+        """Creates the opportunities table. Only needs to be called once."""
+
+    @abstractmethod
+    def insert_new(self, rows: List[dict]) -> int:
+        """Inserts rows whose key is not stored yet and returns how many were inserted"""
+
+    @abstractmethod
+    def list_opportunities(
+        self,
+        opp_type: str = None,
+        processed: bool = None,
+        limit: int = None,
+        track: str = None,
+        after: Tuple[float, str] = None,
+        columns: List[str] = None,
+    ) -> List[dict]:
+        """
+        Returns the stored rows best ranked first, ordered by score then id, and
+        optionally filtered by type, processed status and track. after is the
+        (score, id) of the last row of the previous page, columns defaults to COLUMNS.
+        """
+
+    @abstractmethod
+    def mark_processed(self, ids: List[str]) -> None:
+        """Sets processed = 1 on every row in ids"""
+
+    @abstractmethod
+    def reset_processed_status(self, limit: int = 5) -> None:
+        """Sets processed = 0 on a few processed rows for testing and debugging purposes"""
+
+    @abstractmethod
+    def delete_all_opportunity_type(self, opp_type: str) -> None:
+        """Deletes all opportunities of a specific type for testing purposes only"""
+
+
+class SupabaseStore(OpportunityStore):
+    """Stores opportunities in the Supabase table named by DB_TABLE_NAME"""
+
+    def __init__(self, table_name: str = None):
+        self.table_name = table_name or os.getenv("DB_TABLE_NAME")
+        self.client = db.get_client()
+
+    def describe(self) -> str:
+        return f"Supabase table {self.table_name}"
+
+    def table(self):
+        return self.client.table(self.table_name)
+
+    def create_table(self) -> None:
+        db.create_table(self.table_name)
+
+    def insert_new(self, rows: List[dict]) -> int:
+        # Conflicting keys are ignored, so only newly inserted rows are returned
+        response = (
+            self.table()
+            .upsert(rows, on_conflict="key", ignore_duplicates=True)
+            .execute()
+        )
+
+        return len(response.data or [])
+
+    def list_opportunities(
+        self,
+        opp_type: str = None,
+        processed: bool = None,
+        limit: int = None,
+        track: str = None,
+        after: Tuple[float, str] = None,
+        columns: List[str] = None,
+    ) -> List[dict]:
+        request = self.table().select(",".join(columns or COLUMNS))
+
+        if opp_type is not None:
+            request = request.eq("type", opp_type)
+        if track is not None:
+            request = request.eq("track", track)
+        if processed is not None:
+            request = request.eq("processed", int(processed))
+        if after is not None:
+            score, last_id = after
+            request = request.or_(
+                f"score.lt.{score!r},and(score.eq.{score!r},id.lt.{last_id})"
+            )
+
+        request = request.order("score", desc=True).order("id", desc=True)
+
+        if limit is not None:
+            request = request.limit(limit)
+
+        return request.execute().data
+
+    def mark_processed(self, ids: List[str]) -> None:
+        self.table().update({"processed": 1}).in_("id", ids).execute()
+
+    def reset_processed_status(self, limit: int = 5) -> None:
+        self.table().update({"processed": 0}).eq("processed", 1).limit(limit).execute()
+
+    def delete_all_opportunity_type(self, opp_type: str) -> None:
+        self.table().delete().eq("type", opp_type).execute()
+
+
+class SQLiteStore(OpportunityStore):
+    """Stores opportunities in a local SQLite file, no network involved"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("SQLITE_DB_PATH", SQLITE_DB_PATH)
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+
+        # WAL lets readers run while a write is in progress
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_table()
+
+    def describe(self) -> str:
+        return f"SQLite file {self.path}"
+
+    def create_table(self) -> None:
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS opportunities (
+                    id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL UNIQUE,
+                    company TEXT,
+                    title TEXT,
+                    location TEXT,
+                    link TEXT,
+                    processed INTEGER DEFAULT 0,
+                    type TEXT,
+                    track TEXT NOT NULL DEFAULT 'default',
+                    source TEXT,
+                    score REAL NOT NULL DEFAULT 0
+                )
+                """)
+
+            # Rows stored before tracks existed land in the default track, before ranking at the bottom
+            columns = [
+                row["name"]
+                for row in self.connection.execute("PRAGMA table_info(opportunities)")
+            ]
+            for column, definition in MIGRATED_COLUMNS.items():
+                if column not in columns:
+                    self.connection.execute(
+                        f"ALTER TABLE opportunities ADD COLUMN {column} {definition}"
+                    )
+
+            # Serves every digest page straight from the index, in rank order, so the
+            # indexes it replaces would only slow down every write
+            for index in [
+                "opportunities_type_processed",
+                "opportunities_track_type_processed",
+            ]:
+                self.connection.execute(f"DROP INDEX IF EXISTS {index}")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS opportunities_selection ON opportunities (track, type, processed, score DESC, id DESC)"
+            )
+
+    def insert_new(self, rows: List[dict]) -> int:
+        placeholders = ", ".join("?" * len(COLUMNS))
+
+        with self.connection:
+            cursor = self.connection.executemany(
+                f"INSERT OR IGNORE INTO opportunities ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                [
+                    [
+                        int(row[column]) if column == "processed" else row[column]
+                        for column in COLUMNS
+                    ]
+                    for row in rows
+                ],
+            )
+
+        return cursor.rowcount
+
+    def list_opportunities(
+        self,
+        opp_type: str = None,
+        processed: bool = None,
+        limit: int = None,
+        track: str = None,
+        after: Tuple[float, str] = None,
+        columns: List[str] = None,
+    ) -> List[dict]:
+        conditions = []
+        parameters = []
+
+        if opp_type is not None:
+            conditions.append("type = ?")
+            parameters.append(opp_type)
+        if track is not None:
+            conditions.append("track = ?")
+            parameters.append(track)
+        if processed is not None:
+            conditions.append("processed = ?")
+            parameters.append(int(processed))
+        if after is not None:
+            conditions.append("(score, id) < (?, ?)")
+            parameters.extend(after)
+
+        columns = columns or COLUMNS
+        if not set(columns).issubset(COLUMNS):
+            raise ValueError(f"Unknown columns in {columns}.")
+
+        query = f"SELECT {', '.join(columns)} FROM opportunities"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY score DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        return [dict(row) for row in self.connection.execute(query, parameters)]
+
+    def mark_processed(self, ids: List[str]) -> None:
+        with self.connection:
+            for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+                chunk = ids[start : start + SQLITE_MAX_VARIABLES]
+
+                self.connection.execute(
+                    f"UPDATE opportunities SET processed = 1 WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+
+    def reset_processed_status(self, limit: int = 5) -> None:
+        with self.connection:
+            self.connection.execute(
+                "UPDATE opportunities SET processed = 0 WHERE id IN (SELECT id FROM opportunities WHERE processed = 1 LIMIT ?)",
+                (limit,),
+            )
+
+    def delete_all_opportunity_type(self, opp_type: str) -> None:
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM opportunities WHERE type = ?", (opp_type,)
+            )
+
+
+STORES = {"supabase": SupabaseStore, "sqlite": SQLiteStore}
+STORE_INSTANCE = None
+
+
+def get_store() -> OpportunityStore:
+    """Returns the process wide store of the STORAGE_BACKEND configured backend"""
+
+    global STORE_INSTANCE
+
+    if STORE_INSTANCE is None:
+        load_dotenv()
+        backend = os.getenv("STORAGE_BACKEND", STORAGE_BACKEND)
+
+        if backend not in STORES:
+            raise EnvironmentError(f"Unknown STORAGE_BACKEND '{backend}'.")
+
+        STORE_INSTANCE = STORES[backend]()
+
+    return STORE_INSTANCE
@@ -0,0 +1,78 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List
+import utility.utils as utils
+import utility.webhook as webhook
+from utility.opportunity import DEFAULT_TRACK
+
+
+@dataclass(frozen=True)
+class Track:
+    """Struct to hold an audience, its prompts, message template and webhooks"""
+
+    name: str
+    prompts: Dict[str, str]  # Prompt per opportunity type, see determine_prompts()
+    template: str
+    webhooks: List[str]
+
+
+def read_track(
+    name: str, prompts_path: str, message_path: str, webhook_value: str
+) -> Track:
+    """Reads the prompts and message template of a single track"""
+
+    customized_object = utils.user_customization([message_path, prompts_path])
+
+    return Track(
+        name=name,
+        prompts=utils.determine_prompts(customized_object["customized_prompts"]),
+        template=utils.determine_customized_message(
+            customized_object["customized_message"]
+        ),
+        webhooks=webhook.parse_webhook_urls(webhook_value),
+    )
+
+
+def load_tracks(path: str = None) -> List[Track]:
+    """
+    Returns the tracks listed in the TRACKS_PATH file. Without one, PROMPTS_PATH,
+    MESSAGE_PATH and DISCORD_WEBHOOK make up the single default track.
+    """
+
+    path = path or os.getenv("TRACKS_PATH")
+
+    if not path:
+        return [
+            read_track(
+                DEFAULT_TRACK,
+                os.getenv("PROMPTS_PATH"),
+                os.getenv("MESSAGE_PATH"),
+                os.getenv("DISCORD_WEBHOOK"),
+            )
+        ]
+
+    with open(path, "r") as file:
+        entries = json.load(file)
+
+    # A track without webhooks would silently deliver nothing on every run
+    for entry in entries:
+        if not os.getenv(entry["webhook_env"], "").strip():
+            raise EnvironmentError(
+                f"Track '{entry['name']}' needs its webhook env variable {entry['webhook_env']} to be set."
+            )
+
+    tracks = [
+        read_track(
+            entry["name"],
+            entry["prompts"],
+            entry.get("message", os.getenv("MESSAGE_PATH")),
+            os.getenv(entry["webhook_env"]),
+        )
+        for entry in entries
+    ]
+
+    if len({track.name for track in tracks}) != len(tracks):
+        raise ValueError(f"Track names in '{path}' must be unique.")
+
+    return tracks
@@ -1,39 +1,46 @@
+from dataclasses import replace
 from datetime import date, datetime
-import requests
-from typing import List
+from typing import TYPE_CHECKING, List
 import os
-import argparse
-import uuid
 import json
-from bs4 import BeautifulSoup
+from dotenv import load_dotenv
 from utility.opportunity import Opportunity
-from utility.blocklist import BlockList
+import utility.opportunity as opps
 from utility.error import ErrorMsg
+import utility.parser as parser
+import utility.config as config
+import utility.http_cache as http_cache
 
-# ----------------- FOR CLI LIBRARY COMMAND -----------------
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
+INITIALIZED = False
 
-def extract_command_value():
-    """Returns the value of type str prompted in the command line following --days-needed"""
+# ----------------- INITIALIZATION -----------------
 
-    parser = argparse.ArgumentParser(
-        description="Custom command for specifying days for fetching jobs."
-    )
 
-    # Add an argument (the custom command) along with the help functionality to see what the command does
-    parser.add_argument(
-        "--days-needed",
-        type=str,
-        nargs=1,
-        help="The amount of days to extract jobs.",
-    )
+def initialize() -> None:
+    """
+    Loads the .env file and verifies the env variables. Runs once, importing a
+    module never does this on its own so commands like --help start instantly.
+    """
+
+    global INITIALIZED
+
+    if not INITIALIZED:
+        load_dotenv()
+        verify_set_env_variables()
+        INITIALIZED = True
 
-    parser.add_argument(
-        "--create", action="store_true", help="Creates the table in your database."
-    )
+
+# ----------------- FOR CLI LIBRARY COMMAND -----------------
+
+
+def extract_command_value(argv: List[str] = None):
+    """Returns the value of type str prompted in the command line following --days-needed"""
 
     # Parse the argument and insert into a variable
-    arguments = parser.parse_args()
+    arguments = config.build_argument_parser().parse_args(argv)
 
     return arguments
 
@@ -54,6 +61,31 @@ def verify_set_env_variables() -> any:
         "MESSAGE_PATH",
     ]
 
+    # A local SQLite store does not need Supabase credentials
+    if os.getenv("STORAGE_BACKEND") == "sqlite":
+        env_variables = [
+            variable
+            for variable in env_variables
+            if variable not in ["SUPABASE_URL", "SUPABASE_KEY", "DB_TABLE_NAME"]
+        ]
+
+    # A tracks file names the prompts and webhooks of every track itself
+    if os.getenv("TRACKS_PATH"):
+        env_variables = [
+            variable
+            for variable in env_variables
+            if variable not in ["PROMPTS_PATH", "DISCORD_WEBHOOK"]
+        ]
+
+    # Sources picked through SOURCES are checked against their own requires
+    if os.getenv("SOURCES"):
+        env_variables = [
+            variable
+            for variable in env_variables
+            if variable
+            not in ["LINKEDIN_URL", "GH_INTERN24_URL", "LINKEDIN_INTERN_URL"]
+        ]
+
     # Checks to see if the env variables in env_variables
     # all exist in the current variables
     if not set(os.environ).issuperset(env_variables):
@@ -65,6 +97,13 @@ def calculate_day_difference(elem: datetime) -> int:
 
     all_dates = elem.find("time")
     datetime_val = all_dates.get("datetime")
+
+    return calculate_date_difference(datetime_val)
+
+
+def calculate_date_difference(datetime_val: str) -> int:
+    """Calculates day difference between a YYYY-MM-DD date and the relevant day today"""
+
     date_object = datetime.strptime(datetime_val, "%Y-%m-%d")
 
     today_date = date.today()
@@ -79,14 +118,60 @@ def calculate_day_difference(elem: datetime) -> int:
     return day_difference
 
 
-from typing import List
+from typing import Iterator, List
 from datetime import datetime
-import re
+from itertools import islice
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from difflib import SequenceMatcher
 import random
 
+# Title similarity above which two postings of a company are one
+FUZZY_TITLE_RATIO = 0.9
+
+
+def iter_blueprint_opportunities(
+    content,  # Parsed content or raw html
+    div_elem,  # Class to traverse job elements
+    company_elem,  # Class to receive the company text
+    title_elem,  # Class to receive the title text
+    location_elem,  # Class to receive the location text
+    link_elem,  # Class to receive the link
+    date_limit: bool,  # If true will compare the command line value to date difference, else will not be accounted for in the final list
+    opp_type: str,
+    days_needed: int = 0,  # The --days-needed value of the run
+) -> Iterator[Opportunity]:
+    """Lazily yields each opportunity found in the parsed content"""
+
+    selectors = parser.CardSelectors(
+        div_elem, company_elem, title_elem, location_elem, link_elem
+    )
+
+    for card in parser.extract_cards(content, selectors):
+        company = card["company"]
+        if not company or not card["title"] or not card["link"]:
+            continue  # Skip cards missing the fields needed to identify a posting
+
+        try:
+            date_difference = calculate_date_difference(card["datetime"])
+        except Exception as e:
+            ErrorMsg().date_difference_failure(e)
+            continue  # Skip this element if there's an issue
+
+        if date_limit and date_difference > days_needed:
+            continue
+
+        yield Opportunity(
+            company=company,
+            title=card["title"],
+            location=card["location"] or "",  # Some cards list no location
+            link=card["link"].split("?")[0],
+            processed=False,
+            type_of_opportunity=opp_type,
+        )
+
 
 def blueprint_opportunity_formatter(
-    content,  # Parsed content
+    content,  # Parsed content or raw html
     div_elem,  # Class to traverse job elements
     company_elem,  # Class to receive the company text
     title_elem,  # Class to receive the title text
@@ -95,68 +180,48 @@ def blueprint_opportunity_formatter(
     date_limit: bool,  # If true will compare the command line value to date difference, else will not be accounted for in the final list
     len_of_jobs: int,  # Determines how many jobs will be stored in the final List[Opportunity]
     opp_type: str,
+    days_needed: int = 0,  # The --days-needed value of the run
 ) -> List[Opportunity]:
     """Helper function which serves as a data extraction blueprint for specific formatting"""
 
-    div = content.find_all("div", class_=div_elem)
-    days_needed_command_value = extract_command_value().days_needed[0]
-
-    # Validate and clean days_needed_command_value
-    try:
-        days_needed = int(re.sub(r"\D", "", days_needed_command_value))
-    except ValueError:
-        days_needed = 0  # Default to 0 or handle as needed
-
-    internship_list = []
-
-    for elem in div:
-        company = elem.find(class_=company_elem).text.strip()
-        if not BlockList().is_blacklisted_company(company):
-            title = elem.find(class_=title_elem).text.strip()
-            location = elem.find(class_=location_elem).text.strip()
-            link = elem.find(class_=link_elem)["href"].split("?")[0]
-            processed = False
-
-            try:
-                date_difference = calculate_day_difference(elem)
-            except Exception as e:
-                ErrorMsg().date_difference_failure(e)
-                continue  # Skip this element if there's an issue
-
-            if len(internship_list) < len_of_jobs:
-                if date_limit and days_needed >= date_difference:
-                    opportunity = Opportunity(
-                        id=str(uuid.uuid4()),
-                        company=company,
-                        title=title,
-                        location=location,
-                        link=link,
-                        processed=processed,
-                        type_of_opportunity=opp_type,
-                    )
-                else:
-                    opportunity = Opportunity(
-                        id=str(uuid.uuid4()),
-                        company=company,
-                        title=title,
-                        location=location,
-                        link=link,
-                        processed=processed,
-                        type_of_opportunity=opp_type,
-                    )
-
-                internship_list.append(opportunity)
-
-    return internship_list
-
-
-def content_parser(url) -> BeautifulSoup:
+    opportunities = iter_blueprint_opportunities(
+        content,
+        div_elem,
+        company_elem,
+        title_elem,
+        location_elem,
+        link_elem,
+        date_limit,
+        opp_type,
+        days_needed,
+    )
+
+    return list(islice(opportunities, len_of_jobs))
+
+
+def paginate_url(url: str, param: str, value: int) -> str:
+    """Returns the url with the query parameter set to value"""
+
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query[param] = str(value)
+
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def content_parser(url) -> "BeautifulSoup":
     """Helper function to return parsed content"""
 
-    response = requests.get(url)
-    content = response.text
+    # Served from the local response cache with --http-cache or --replay
+    content = http_cache.cached_request(url).text
+
+    return parse_content(content)
+
 
-    return BeautifulSoup(content, "html.parser")
+def parse_content(content: str) -> "BeautifulSoup":
+    """Helper function to parse already downloaded content"""
+
+    return parser.parse_content(content)
 
 
 def merge_all_opportunity_data(*args) -> List[Opportunity]:
@@ -170,6 +235,54 @@ def merge_all_opportunity_data(*args) -> List[Opportunity]:
     return merged_opp_list
 
 
+def dedupe_opportunities(
+    opportunities: List[Opportunity],
+    fuzzy: bool = False,  # Also drops near identical titles of the same company
+    fuzzy_ratio: float = FUZZY_TITLE_RATIO,
+) -> List[Opportunity]:
+    """Normalizes merged opportunities and drops the duplicates, keeping the first seen"""
+
+    seen_links = set()
+    seen_postings = set()
+    titles_by_company = {}
+    unique = []
+
+    for opp in opportunities:
+        # Opportunities are frozen, whitespace is folded into a copy
+        opp = replace(
+            opp,
+            company=" ".join(opp.company.split()),
+            title=" ".join(opp.title.split()),
+            location=" ".join(opp.location.split()),
+        )
+
+        link = opps.normalize_link(opp.link)
+        company = opps.normalize_text(opp.company)
+        title = opps.normalize_text(opp.title)
+        posting = (company, title, opps.normalize_text(opp.location))
+
+        # The same posting is often listed by several sources with a different link
+        if link in seen_links or posting in seen_postings:
+            continue
+
+        if fuzzy and any(
+            SequenceMatcher(None, title, seen_title).ratio() >= fuzzy_ratio
+            for seen_title in titles_by_company.get(company, [])
+        ):
+            continue
+
+        seen_links.add(link)
+        seen_postings.add(posting)
+        titles_by_company.setdefault(company, []).append(title)
+        unique.append(opp)
+
+    print(
+        f"Removed {len(opportunities) - len(unique)} duplicate opportunities out of {len(opportunities)}."
+    )
+
+    return unique
+
+
 def user_customization(file_paths: List[str]) -> dict:
     """Returns users customization for both message and prompt"""
 
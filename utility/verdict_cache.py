@@ -0,0 +1,101 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Tuple
+
+VERDICT_CACHE_PATH = ".cache/verdicts.sqlite3"
+VERDICT_CACHE_TTL = 60 * 60 * 24 * 14  # Seconds a verdict stays valid, two weeks
+VERDICT_CACHE_MAX_ENTRIES = 10000  # Oldest verdicts are evicted past this size
+SQLITE_MAX_VARIABLES = 500  # Keys bound per IN (...) lookup
+
+
+class VerdictCache:
+    """Persists LLM verdicts keyed by posting fingerprint, prompt and model"""
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: int = VERDICT_CACHE_TTL,
+        max_entries: int = VERDICT_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path or os.getenv("VERDICT_CACHE_PATH", VERDICT_CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                verdict INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS verdicts_created_at ON verdicts (created_at)"
+        )
+
+    @staticmethod
+    def key(company: str, title: str, location: str, prompt: str, model: str) -> str:
+        """Returns the cache key of a posting classified with prompt by model"""
+
+        fields = [company, title, location, prompt, model]
+        normalized = "\x1f".join(" ".join(str(field or "").split()) for field in fields)
+
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """Returns the unexpired verdicts found for keys"""
+
+        keys = list(keys)
+        oldest = time.time() - self.ttl
+        verdicts = {}
+
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[start : start + SQLITE_MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(chunk))
+
+            rows = self.connection.execute(
+                f"SELECT key, verdict FROM verdicts WHERE key IN ({placeholders}) AND created_at >= ?",
+                [*chunk, oldest],
+            )
+            verdicts.update((key, bool(verdict)) for key, verdict in rows)
+
+        return verdicts
+
+    def set_many(self, verdicts: List[Tuple[str, bool]]) -> None:
+        """Stores verdicts, then evicts expired and excess entries"""
+
+        now = time.time()
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO verdicts (key, verdict, created_at) VALUES (?, ?, ?)",
+                [(key, int(verdict), now) for key, verdict in verdicts],
+            )
+            self.evict(now)
+
+    def evict(self, now: float = None) -> None:
+        """Drops expired verdicts and the oldest ones beyond max_entries"""
+
+        now = now or time.time()
+
+        self.connection.execute(
+            "DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl,)
+        )
+        self.connection.execute(
+            """
+            DELETE FROM verdicts WHERE key IN (
+                SELECT key FROM verdicts ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection"""
+
+        self.connection.close()
@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set
+import utility.opportunity as opps
+
+WATERMARK_PATH = ".cache/watermarks.sqlite3"
+WATERMARK_MAX_LINKS = 500  # Most recent links remembered per source url
+
+# Consecutive already seen postings after which a listing stops being walked
+KNOWN_STREAK_LIMIT = 3
+
+
+@dataclass
+class Watermark:
+    """Struct to hold how far a source url was scraped in previous runs"""
+
+    etag: str = None
+    last_modified: str = None
+    links: List[str] = field(default_factory=list)  # Normalized links, newest first
+    seen: set = field(default=None, init=False, repr=False)
+
+    # Scraped links and validators waiting on their postings to be stored, see confirm()
+    staged: Dict[str, None] = field(default_factory=dict, init=False, repr=False)
+    staged_validators: tuple = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.seen = set(self.links)
+
+    def conditional_headers(self) -> dict:
+        """Returns the validators to send so an unchanged response comes back as a 304"""
+
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+    def stage_validators(self, headers) -> None:
+        """Holds the ETag and Last-Modified validators of the latest response until confirm()"""
+
+        self.staged_validators = (headers.get("ETag"), headers.get("Last-Modified"))
+
+    def drop_validators(self) -> None:
+        """Forgets the validators after an unfinished walk, so the next one reads the whole listing"""
+
+        self.etag = self.last_modified = None
+        self.staged_validators = None
+
+    def stage_links(self, links: Iterable[str]) -> None:
+        """Holds scraped links, in the order they were listed, until confirm()"""
+
+        for link in links:
+            self.staged[opps.normalize_link(link)] = None
+
+    def confirm(self, links: Set[str]) -> None:
+        """
+        Remembers the staged links found in the normalized links. The staged
+        validators are kept once no staged link is left, as a 304 would skip those.
+        """
+
+        self.add_links(link for link in self.staged if link in links)
+        self.staged = {link: None for link in self.staged if link not in links}
+
+        if not self.staged and self.staged_validators is not None:
+            self.etag, self.last_modified = self.staged_validators
+            self.staged_validators = None
+
+    def has_seen(self, link: str) -> bool:
+        return opps.normalize_link(link) in self.seen
+
+    def add_links(self, links: Iterable[str]) -> None:
+        """Remembers links, in the order they were listed, ahead of the older ones"""
+
+        fresh = []
+
+        for link in links:
+            link = opps.normalize_link(link)
+
+            if link not in self.seen:
+                self.seen.add(link)
+                fresh.append(link)
+
+        self.links = (fresh + self.links)[:WATERMARK_MAX_LINKS]
+        self.seen = set(self.links)
+
+
+class WatermarkStore:
+    """Persists the Watermark of every scraped url, changes are only saved on commit()"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("WATERMARK_PATH", WATERMARK_PATH)
+        self.marks: Dict[str, Watermark] = {}
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                links TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+
+    def get(self, key: str) -> Watermark:
+        """Returns the watermark of key, the same instance for the rest of the run"""
+
+        if key not in self.marks:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, links FROM watermarks WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            self.marks[key] = (
+                Watermark(row[0], row[1], json.loads(row[2])) if row else Watermark()
+            )
+
+        return self.marks[key]
+
+    def begin(self, key: str) -> Watermark:
+        """Returns the watermark of key for a new scrape, dropping what an earlier one left staged"""
+
+        mark = self.get(key)
+        mark.staged = {}
+        mark.staged_validators = None
+
+        return mark
+
+    def confirm(self, links: Iterable[str]) -> None:
+        """Remembers the staged links of every watermark whose postings were stored or rejected"""
+
+        links = {opps.normalize_link(link) for link in links}
+
+        for mark in self.marks.values():
+            mark.confirm(links)
+
+    def commit(self) -> None:
+        """Saves every watermark touched this run, links only count once confirm()ed"""
+
+        now = time.time()
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO watermarks (key, etag, last_modified, links, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, mark.etag, mark.last_modified, json.dumps(mark.links), now)
+                    for key, mark in self.marks.items()
+                ],
+            )
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection"""
+
+        self.connection.close()
+
+
+WATERMARKS_INSTANCE = None
+
+
+def get_watermarks() -> WatermarkStore:
+    """Returns the process wide watermark store"""
+
+    global WATERMARKS_INSTANCE
+
+    if WATERMARKS_INSTANCE is None:
+        WATERMARKS_INSTANCE = WatermarkStore()
+
+    return WATERMARKS_INSTANCE
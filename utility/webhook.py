@@ -0,0 +1,142 @@
+import asyncio
+import random
+import httpx
+from typing import List
+from utility.error import ErrorMsg
+from utility.fetch import AsyncFetcher
+from utility.message import PackedMessage
+import utility.metrics as metrics
+
+WEBHOOK_MAX_RETRY = 5  # Attempts per message before it is given up on
+WEBHOOK_BACKOFF = 1.0  # Base seconds of the jittered backoff after a 5xx
+WEBHOOK_MAX_BACKOFF = 30.0
+DEFAULT_RETRY_AFTER = 1.0  # Seconds waited on a 429 that does not say how long
+
+
+def parse_webhook_urls(value: str) -> List[str]:
+    """Splits a comma separated DISCORD_WEBHOOK value into its urls"""
+
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Returns a full jitter exponential backoff for the attempt"""
+
+    return random.uniform(0, min(WEBHOOK_MAX_BACKOFF, WEBHOOK_BACKOFF * 2**attempt))
+
+
+def retry_after(response: httpx.Response) -> float:
+    """Returns the seconds Discord asks to wait after a 429"""
+
+    try:
+        return float(response.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+async def respect_rate_limit(response: httpx.Response) -> None:
+    """Waits for the bucket to reset once the X-RateLimit headers say it is empty"""
+
+    if response.headers.get("X-RateLimit-Remaining") != "0":
+        return
+
+    try:
+        await asyncio.sleep(float(response.headers["X-RateLimit-Reset-After"]))
+    except (KeyError, ValueError):
+        pass
+
+
+async def send_message(
+    fetcher: AsyncFetcher,
+    webhook_url: str,
+    payload: dict,
+    max_retry: int = WEBHOOK_MAX_RETRY,
+) -> bool:
+    """Posts a single payload, retrying 429s and transient failures, returns if it was delivered"""
+
+    for attempt in range(max_retry):
+        if attempt:
+            metrics.increment("webhook.retries")
+
+        try:
+            with metrics.timer("webhook.request"):
+                response = await fetcher.post(webhook_url, json=payload)
+        except httpx.TransportError as e:
+            print(f"Webhook request failed: {e}. Retrying...")
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+
+        if response.is_success:
+            await respect_rate_limit(response)
+            return True
+
+        if response.status_code == 429:
+            metrics.increment("webhook.rate_limited")
+            await asyncio.sleep(retry_after(response))
+        elif response.status_code >= 500:
+            await asyncio.sleep(backoff_delay(attempt))
+        else:
+            # Any other client error will fail the same way again
+            print(
+                f"Failed to send webhook message. {ErrorMsg().status_code_failure(response.status_code)}"
+            )
+            return False
+
+    print(f"Giving up on webhook message after {max_retry} attempts.")
+
+    return False
+
+
+async def deliver_to_webhook(
+    fetcher: AsyncFetcher, webhook_url: str, messages: List[PackedMessage]
+) -> List[bool]:
+    """Sends messages to one webhook in order, as Discord rate limits per webhook"""
+
+    results = [
+        await send_message(fetcher, webhook_url, packed.payload) for packed in messages
+    ]
+
+    metrics.increment("webhook.delivered_messages", sum(results))
+    metrics.increment("webhook.failed_messages", len(results) - sum(results))
+
+    return results
+
+
+async def deliver_messages(
+    webhook_urls: List[str],
+    messages: List[PackedMessage],
+    fetcher: AsyncFetcher = None,
+) -> list:
+    """
+    Fans messages out to every webhook concurrently and returns the items of
+    the messages that every webhook accepted. Without a fetcher a client is
+    opened for the call.
+    """
+
+    if not webhook_urls:
+        return []
+
+    if fetcher is None:
+        async with AsyncFetcher() as fetcher:
+            return await deliver_messages(webhook_urls, messages, fetcher)
+
+    results = await asyncio.gather(
+        *(deliver_to_webhook(fetcher, url, messages) for url in webhook_urls)
+    )
+
+    delivered = []
+
+    for index, packed in enumerate(messages):
+        if all(result[index] for result in results):
+            delivered += packed.items
+
+    print(
+        f"Delivered {sum(all(sent) for sent in zip(*results))} of {len(messages)} webhook messages to {len(webhook_urls)} webhooks."
+    )
+
+    return delivered